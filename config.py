@@ -33,6 +33,14 @@ class Settings:
     # TomTom API Configuration
     TOMTOM_API_KEY: str = os.getenv("TOMTOM_API_KEY", "")
     
+    # Reverse geocode cache (results keyed by coordinates rounded to ~1 m)
+    TOMTOM_CACHE_TTL_SECONDS: int = int(os.getenv("TOMTOM_CACHE_TTL_SECONDS", "3600"))
+    TOMTOM_CACHE_MAX_SIZE: int = int(os.getenv("TOMTOM_CACHE_MAX_SIZE", "10000"))
+    TOMTOM_PERSISTENT_CACHE_DAYS: int = int(os.getenv("TOMTOM_PERSISTENT_CACHE_DAYS", "30"))
+    
+    # POI categories used for nearby place names (restaurants, shops, landmarks; empty for all)
+    TOMTOM_POI_CATEGORY_SET: str = os.getenv("TOMTOM_POI_CATEGORY_SET", "7315,9361,9362,9376,9902")
+    
     # Google Drive Configuration (replaces Google Sheets)
     GOOGLE_DRIVE_CREDENTIALS_FILE: str = os.getenv("GOOGLE_DRIVE_CREDENTIALS_FILE", "./credentials/service-account.json")
     GOOGLE_DRIVE_FOLDER_ID: str = os.getenv("GOOGLE_DRIVE_FOLDER_ID", "")
@@ -40,6 +48,15 @@ class Settings:
     EXCEL_FILE_NAME: str = os.getenv("EXCEL_FILE_NAME", "guard_scan_reports.xlsx")
     UPDATE_INTERVAL_SECONDS: int = int(os.getenv("UPDATE_INTERVAL_SECONDS", "1"))
     
+    # Google Sheets logging (optional, off by default; services are built on first use)
+    ENABLE_SHEETS: bool = os.getenv("ENABLE_SHEETS", "False").lower() == "true"
+    GOOGLE_SHEETS_CREDENTIALS_FILE: str = os.getenv("GOOGLE_SHEETS_CREDENTIALS_FILE", "")
+    GOOGLE_SHEET_ID: str = os.getenv("GOOGLE_SHEET_ID", "")
+    
+    # Google Sheets update queue (overflow is spilled to a JSON-lines file and replayed)
+    SHEETS_QUEUE_MAX_SIZE: int = int(os.getenv("SHEETS_QUEUE_MAX_SIZE", "10000"))
+    SHEETS_SPILL_FILE: str = os.getenv("SHEETS_SPILL_FILE", "./sheets_spill.jsonl")
+    
     # QR Location Configuration
     WITHIN_RADIUS_METERS: float = float(os.getenv("WITHIN_RADIUS_METERS", "100.0"))
     
@@ -78,6 +95,10 @@ class Settings:
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "100"))
     
+    # Authenticated user cache (seconds a fetched user document is reused)
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+    USER_CACHE_MAX_SIZE: int = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+    
     # Timezone Configuration
     TIMEZONE: str = os.getenv("TIMEZONE", "Asia/Kolkata")
     
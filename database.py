@@ -4,10 +4,12 @@ Updated for Email-OTP authentication system with MongoDB
 """
 
 import os
+import re
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 import logging
 from datetime import datetime, timedelta
+from typing import Any, Dict
 from config import settings
 
 # Load environment variables
@@ -42,6 +44,9 @@ async def init_database():
         logger.info(f"✅ Connected to MongoDB")
         logger.info(f"📊 Using database: {settings.DATABASE_NAME}")
         
+        # Convert legacy string userId references before anything joins on them
+        await migrate_role_user_ids()
+        
         # Create indexes for better performance
         await create_indexes()
         
@@ -58,6 +63,31 @@ async def init_database():
         database = None
 
 
+async def migrate_role_user_ids():
+    """
+    Convert string userId values on guards and supervisors to ObjectId
+    
+    Role records used to store str(user["_id"]); joins against users._id now
+    expect the ObjectId. Only string values are touched, so this is idempotent,
+    and values that are not valid ObjectId hex strings are left as they are.
+    """
+    if database is None:
+        return
+    
+    for collection_name in ("guards", "supervisors"):
+        try:
+            result = await database[collection_name].update_many(
+                {"userId": {"$type": "string"}},
+                [{"$set": {"userId": {
+                    "$convert": {"input": "$userId", "to": "objectId", "onError": "$userId"}
+                }}}]
+            )
+            if result.modified_count:
+                logger.info(f"🔄 Converted {result.modified_count} {collection_name} userId values to ObjectId")
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to migrate {collection_name} userId values: {e}")
+
+
 async def cleanup_old_indexes():
     """Remove old/conflicting database indexes"""
     if database is None:
@@ -122,11 +152,13 @@ async def create_indexes():
             unique=True,
             name="org_site_supervisor_unique"
         )
+        await database.qr_locations.create_index("supervisorId")
         await database.qr_locations.create_index([("lat", 1), ("lng", 1)])
         await database.qr_locations.create_index("active")
         
         # Scan Events collection indexes
         await database.scan_events.create_index([("guardId", 1), ("scannedAt", -1)])
+        await database.scan_events.create_index([("guardEmail", 1), ("scannedAt", -1), ("_id", -1)])
         await database.scan_events.create_index([("supervisorId", 1), ("scannedAt", -1)])
         await database.scan_events.create_index([("qrId", 1), ("scannedAt", -1)])
         await database.scan_events.create_index("scannedAt")
@@ -183,6 +215,10 @@ async def create_ttl_indexes():
         await database.refresh_tokens.create_index("expiresAt", expireAfterSeconds=0)
         logger.info("✅ Created TTL index for refresh tokens")
         
+        # Reverse geocode cache - entries expire based on expiresAt field
+        await database.geocode_cache.create_index("expiresAt", expireAfterSeconds=0)
+        logger.info("✅ Created TTL index for geocode cache")
+        
         # Optional: Clean up old scan events after 1 year (365 days)
         # Uncomment if you want to auto-cleanup old scan data
         # await database.scan_events.create_index("createdAt", expireAfterSeconds=365*24*60*60)
@@ -209,7 +245,8 @@ async def ensure_collections():
             "scan_events",
             "otp_tokens",
             "refresh_tokens",
-            "building_sites"
+            "building_sites",
+            "geocode_cache"
         ]
         
         existing_collections = await database.list_collection_names()
@@ -286,6 +323,31 @@ def get_refresh_tokens_collection():
     return get_collection("refresh_tokens")
 
 
+def get_geocode_cache_collection():
+    """Get reverse geocode cache collection"""
+    return get_collection("geocode_cache")
+
+
+# Query helpers
+def build_state_filter(state: str) -> Dict[str, Any]:
+    """
+    Build a scan filter matching the state/area anywhere in the stored address
+    
+    Args:
+        state: State/area name, matched literally and case-insensitively
+        
+    Returns:
+        MongoDB $or filter over address and formatted_address
+    """
+    state_pattern = re.compile(re.escape(state), re.IGNORECASE)
+    return {
+        "$or": [
+            {"address": state_pattern},
+            {"formatted_address": state_pattern}
+        ]
+    }
+
+
 async def get_database_health() -> dict:
     """Get database health status"""
     if database is None:
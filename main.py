@@ -67,6 +67,8 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("🛑 Shutting down Guard Management System...")
     from database import close_database
+    from services.tomtom_service import tomtom_service
+    await tomtom_service.aclose()
     await close_database()
 
 
@@ -116,6 +118,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Before", "X-Next-Before-Id"],
 )
 
 # Include routers
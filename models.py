@@ -14,16 +14,25 @@ from bson import ObjectId
 PyObjectId = Annotated[str, Field(alias="_id")]
 
 
+# Characters dropped from area names when building emails
+_AREA_TRANSLATE = str.maketrans('', '', ' -')
+
+
+def _clean_area(area_city: str) -> str:
+    """Normalize an area name for use in an email local part"""
+    return area_city.lower().strip().translate(_AREA_TRANSLATE)
+
+
 def generate_supervisor_email(area_city: str) -> str:
     """Generate supervisor email from area city: {area}supervisor@lh.io.in"""
-    clean_area = area_city.lower().strip().replace(' ', '').replace('-', '')
+    clean_area = _clean_area(area_city)
     return f"{clean_area}supervisor@lh.io.in"
 
 
 def generate_guard_email(guard_name: str, area_city: str) -> str:
     """Generate guard email: {firstname}.{area}@lh.io.in"""
-    first_name = guard_name.split(' ')[0].lower().strip()
-    clean_area = area_city.lower().strip().replace(' ', '').replace('-', '')
+    first_name = guard_name.split(' ', 1)[0].lower().strip()
+    clean_area = _clean_area(area_city)
     return f"{first_name}.{clean_area}@lh.io.in"
 
 
@@ -9,16 +9,18 @@ from fastapi.responses import FileResponse
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 import logging
-import os
 import io
+import pandas as pd
+from pathlib import Path
 from bson import ObjectId
 
 # Import services and dependencies
-from services.auth_service import get_current_admin
+from services.auth_service import get_current_admin_light
 from services.google_drive_excel_service import google_drive_excel_service
 from database import (
     get_users_collection, get_supervisors_collection, get_guards_collection,
-    get_scan_events_collection, get_qr_locations_collection, get_database_health
+    get_scan_events_collection, get_qr_locations_collection, get_database_health,
+    build_state_filter
 )
 from config import settings
 
@@ -35,9 +37,15 @@ logger = logging.getLogger(__name__)
 # Create router
 admin_router = APIRouter()
 
+# Fixed area report column widths (Area ... Address Lookup Success)
+EXCEL_COLUMN_WIDTHS = {
+    "A": 16, "B": 22, "C": 28, "D": 12, "E": 10, "F": 22,
+    "G": 40, "H": 40, "I": 12, "J": 12, "K": 18, "L": 18
+}
+
 
 @admin_router.get("/dashboard")
-async def get_admin_dashboard(current_admin: Dict[str, Any] = Depends(get_current_admin)):
+async def get_admin_dashboard(current_admin: Dict[str, Any] = Depends(get_current_admin_light)):
     """
     Admin dashboard with system statistics
     """
@@ -47,12 +55,8 @@ async def get_admin_dashboard(current_admin: Dict[str, Any] = Depends(get_curren
         guards_collection = get_guards_collection()
         scan_events_collection = get_scan_events_collection()
         
-        if not all([
-            users_collection is not None, 
-            supervisors_collection is not None, 
-            guards_collection is not None, 
-            scan_events_collection is not None
-        ]):
+        if (users_collection is None or supervisors_collection is None or 
+            guards_collection is None or scan_events_collection is None):
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Database not available"
@@ -117,7 +121,7 @@ async def get_admin_dashboard(current_admin: Dict[str, Any] = Depends(get_curren
 
 @admin_router.get("/excel/area-wise-reports")
 async def get_area_wise_excel_reports(
-    current_admin: Dict[str, Any] = Depends(get_current_admin),
+    current_admin: Dict[str, Any] = Depends(get_current_admin_light),
     days_back: int = Query(7, ge=1, le=30, description="Number of days to include in report"),
     area: Optional[str] = Query(None, description="Specific area/state to filter (optional)")
 ):
@@ -145,17 +149,7 @@ async def get_area_wise_excel_reports(
         
         # Add area filter if specified
         if area:
-            area_filter = {
-                "$and": [
-                    base_filter,
-                    {
-                        "$or": [
-                            {"address": {"$regex": area, "$options": "i"}},
-                            {"formatted_address": {"$regex": area, "$options": "i"}}
-                        ]
-                    }
-                ]
-            }
+            area_filter = {"$and": [base_filter, build_state_filter(area)]}
         else:
             area_filter = base_filter
         
@@ -226,13 +220,20 @@ async def get_area_wise_excel_reports(
             elif scan.get("guardEmail"):
                 guard_name = scan["guardEmail"].split("@")[0]
             
+            # Split scan datetime into date and time columns
+            scanned_at = scan.get("scannedAt")
+            if scanned_at:
+                scan_date, _, scan_time = scanned_at.isoformat(sep=" ", timespec="seconds").partition(" ")
+            else:
+                scan_date = scan_time = ""
+            
             # Prepare row data
             row_data = {
                 "Area": area_name,
                 "Guard Name": guard_name,
                 "Guard Email": scan.get("guardEmail", ""),
-                "Scan Date": scan.get("scannedAt", "").strftime("%Y-%m-%d") if scan.get("scannedAt") else "",
-                "Scan Time": scan.get("scannedAt", "").strftime("%H:%M:%S") if scan.get("scannedAt") else "",
+                "Scan Date": scan_date,
+                "Scan Time": scan_time,
                 "Timestamp IST": scan.get("timestampIST", ""),
                 "Detailed Address": scan.get("address", ""),
                 "Formatted Address": scan.get("formatted_address", ""),
@@ -244,10 +245,9 @@ async def get_area_wise_excel_reports(
             area_data[area_name].append(row_data)
         
         # Create Excel files for each area
-        import pandas as pd
         excel_files = {}
-        excel_folder = "excel_reports"
-        os.makedirs(excel_folder, exist_ok=True)
+        excel_folder = Path("excel_reports")
+        excel_folder.mkdir(exist_ok=True)
         
         for area_name, data in area_data.items():
             if not data:
@@ -255,7 +255,7 @@ async def get_area_wise_excel_reports(
                 
             # Generate filename
             filename = f"area_report_{area_name.replace(' ', '_')}_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.xlsx"
-            file_path = os.path.join(excel_folder, filename).replace("/", "\\")
+            file_path = excel_folder / filename
             
             # Create DataFrame and Excel file
             df = pd.DataFrame(data)
@@ -265,24 +265,13 @@ async def get_area_wise_excel_reports(
             with pd.ExcelWriter(output, engine='openpyxl') as writer:
                 df.to_excel(writer, sheet_name=f'{area_name}_Scans', index=False)
                 
-                # Auto-adjust column widths
+                # Set column widths
                 worksheet = writer.sheets[f'{area_name}_Scans']
-                for column in worksheet.columns:
-                    max_length = 0
-                    column_letter = column[0].column_letter
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                        except:
-                            pass
-                    adjusted_width = min(max_length + 2, 50)
-                    worksheet.column_dimensions[column_letter].width = adjusted_width
+                for column_letter, width in EXCEL_COLUMN_WIDTHS.items():
+                    worksheet.column_dimensions[column_letter].width = width
             
             # Save to file
-            output.seek(0)
-            with open(file_path, 'wb') as f:
-                f.write(output.getvalue())
+            file_path.write_bytes(output.getvalue())
             
             excel_files[area_name] = {
                 "filename": filename,
@@ -8,6 +8,7 @@ from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
+import asyncio
 import logging
 from bson import ObjectId
 
@@ -241,8 +242,11 @@ async def signup(signup_data: SignupRequest):
                 detail="Database not available"
             )
         
-        # Check if user already exists
-        existing_user = await users_collection.find_one({"email": signup_data.email})
+        # Check if user already exists while bcrypt hashes the password in a worker thread
+        existing_user, password_hash = await asyncio.gather(
+            users_collection.find_one({"email": signup_data.email}, {"isActive": 1}),
+            asyncio.to_thread(jwt_service.hash_password, signup_data.password)
+        )
         if existing_user:
             # If user exists but is inactive, allow re-signup (resend OTP)
             if existing_user.get("isActive", False):
@@ -254,16 +258,18 @@ async def signup(signup_data: SignupRequest):
                 # Delete inactive user to allow fresh signup
                 await users_collection.delete_one({"email": signup_data.email})
         
+        now = datetime.utcnow()
+        
         # Create user record (inactive)
         user_data = {
             "email": signup_data.email,
-            "passwordHash": jwt_service.hash_password(signup_data.password),
+            "passwordHash": password_hash,
             "name": signup_data.name,
             "role": signup_data.role.value,
             "areaCity": signup_data.areaCity,
             "isActive": False,  # Inactive until email verified
-            "createdAt": datetime.utcnow(),
-            "updatedAt": datetime.utcnow()
+            "createdAt": now,
+            "updatedAt": now
         }
         
         result = await users_collection.insert_one(user_data)
@@ -364,8 +370,8 @@ async def login(username: str = Form(...), password: str = Form(...)):
                 detail="Invalid email or password"
             )
         
-        # Check password
-        if not jwt_service.verify_password(password, user["passwordHash"]):
+        # Check password (bcrypt runs in a worker thread to keep the event loop free)
+        if not await asyncio.to_thread(jwt_service.verify_password, password, user["passwordHash"]):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
@@ -379,17 +385,19 @@ async def login(username: str = Form(...), password: str = Form(...)):
             )
         
         # Update last login
+        now = datetime.utcnow()
         await users_collection.update_one(
             {"_id": user["_id"]},
-            {"$set": {"lastLogin": datetime.utcnow()}}
+            {"$set": {"lastLogin": now}}
         )
-        user["lastLogin"] = datetime.utcnow()
+        user["lastLogin"] = now
         
         # Create proper JWT access token
         access_token = jwt_service.create_access_token({
             "user_id": str(user["_id"]),
             "email": user["email"],
-            "role": user["role"]
+            "role": user["role"],
+            "name": user.get("name", "")
         })
         
         # Return OAuth2 compatible response with access_token
@@ -488,7 +496,7 @@ async def reset_password_confirm(reset_data: ResetPasswordConfirmRequest):
             )
         
         # Update password
-        new_password_hash = jwt_service.hash_password(reset_data.newPassword)
+        new_password_hash = await asyncio.to_thread(jwt_service.hash_password, reset_data.newPassword)
         
         result = await users_collection.update_one(
             {"email": reset_data.email, "isActive": True},
@@ -533,7 +541,7 @@ async def resend_otp(email: str, purpose: str = "signup"):
         # For signup, check if user exists and is inactive
         if otp_purpose == OTPPurpose.SIGNUP:
             users_collection = get_users_collection()
-            if users_collection:
+            if users_collection is not None:
                 user = await users_collection.find_one({"email": email})
                 if not user:
                     raise HTTPException(
@@ -580,13 +588,13 @@ async def create_role_specific_record(user: Dict[str, Any]):
         
         if user_role == UserRole.SUPERVISOR.value or user_role == "SUPERVISOR":
             supervisors_collection = get_supervisors_collection()
-            if supervisors_collection:
+            if supervisors_collection is not None:
                 # Generate supervisor code
                 count = await supervisors_collection.count_documents({})
                 supervisor_code = f"SUP{str(count + 1).zfill(3)}"
                 
                 supervisor_data = {
-                    "userId": str(user["_id"]),
+                    "userId": user["_id"],
                     "code": supervisor_code,
                     "areaCity": user.get("areaCity", ""),
                     "createdAt": datetime.utcnow(),
@@ -598,14 +606,14 @@ async def create_role_specific_record(user: Dict[str, Any]):
         
         elif user_role == UserRole.GUARD.value or user_role == "GUARD":
             guards_collection = get_guards_collection()
-            if guards_collection:
+            if guards_collection is not None:
                 # Note: supervisorId should be set when admin assigns guard to supervisor
                 # For now, create basic record without supervisor assignment
                 count = await guards_collection.count_documents({})
                 employee_code = f"GRD{str(count + 1).zfill(3)}"
                 
                 guard_data = {
-                    "userId": str(user["_id"]),
+                    "userId": user["_id"],
                     "supervisorId": "",  # To be assigned by admin
                     "employeeCode": employee_code,
                     "createdAt": datetime.utcnow(),
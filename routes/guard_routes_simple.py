@@ -3,14 +3,14 @@ Guard routes for QR scanning and attendance marking
 GUARD role only - scan QR codes and view own scan history
 """
 
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 import logging
 from bson import ObjectId
 
 # Import services and dependencies
-from services.auth_service import get_current_guard
+from services.auth_service import get_current_guard, get_current_guard_light
 from database import get_scan_events_collection
 from config import settings
 
@@ -19,6 +19,24 @@ logger = logging.getLogger(__name__)
 # Create router
 guard_router = APIRouter()
 
+# Fields read when building guard scan history entries
+SCAN_HISTORY_PROJECTION = {
+    "guardId": 1,
+    "guardEmail": 1,
+    "qrId": 1,
+    "originalScanContent": 1,
+    "scannedAt": 1,
+    "deviceLat": 1,
+    "deviceLng": 1,
+    "address": 1,
+    "formatted_address": 1,
+    "address_components": 1,
+    "address_lookup_success": 1,
+    "timestampIST": 1,
+    "locationUpdated": 1,
+    "status": 1
+}
+
 
 @guard_router.get("/profile")
 async def get_guard_profile(current_guard: Dict[str, Any] = Depends(get_current_guard)):
@@ -77,11 +95,19 @@ async def get_guard_profile(current_guard: Dict[str, Any] = Depends(get_current_
 
 @guard_router.get("/scans")
 async def get_guard_scans(
-    current_guard: Dict[str, Any] = Depends(get_current_guard),
+    response: Response,
+    current_guard: Dict[str, Any] = Depends(get_current_guard_light),
     limit: int = Query(50, ge=1, le=500, description="Number of scans to return"),
-    skip: int = Query(0, ge=0, description="Number of scans to skip")
+    skip: int = Query(0, ge=0, description="Number of scans to skip (deprecated, use before/before_id)"),
+    before: Optional[datetime] = Query(None, description="scannedAt of the last scan on the previous page"),
+    before_id: Optional[str] = Query(None, description="_id of the last scan on the previous page")
 ):
-    """Get guard's own scan history"""
+    """
+    Get guard's own scan history
+    
+    When a full page is returned, the X-Next-Before and X-Next-Before-Id
+    response headers carry the before/before_id values for the next page.
+    """
     try:
         scan_events_collection = get_scan_events_collection()
         
@@ -96,12 +122,38 @@ async def get_guard_scans(
         # Get scans with pagination - look for guard's email instead of guardId
         guard_email = current_guard.get("email", "")
         
+        scan_filter = {"guardEmail": guard_email}
+        
+        # Keyset pagination: continue strictly after the (scannedAt, _id) of the previous page
+        if before is not None:
+            if before_id:
+                try:
+                    before_object_id = ObjectId(before_id)
+                except Exception:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="Invalid before_id"
+                    )
+                scan_filter["$or"] = [
+                    {"scannedAt": {"$lt": before}},
+                    {"scannedAt": before, "_id": {"$lt": before_object_id}}
+                ]
+            else:
+                scan_filter["scannedAt"] = {"$lt": before}
+        
+        # Fetch the page in one batch, carrying only the fields the response uses
         scans_cursor = scan_events_collection.find(
-            {"guardEmail": guard_email}
-        ).sort("scannedAt", -1).skip(skip).limit(limit)
+            scan_filter,
+            projection=SCAN_HISTORY_PROJECTION
+        ).sort([("scannedAt", -1), ("_id", -1)])
+        
+        if skip:
+            scans_cursor = scans_cursor.skip(skip)
+        
+        scan_docs = await scans_cursor.limit(limit).to_list(length=limit)
         
         scans = []
-        async for scan in scans_cursor:
+        for scan in scan_docs:
             scan_data = {
                 "_id": str(scan["_id"]),
                 "guardId": str(scan.get("guardId", "")),
@@ -124,6 +176,14 @@ async def get_guard_scans(
             }
             scans.append(scan_data)
         
+        # Cursor for the next page; a short page means there is nothing after it
+        if len(scan_docs) == limit:
+            last_scan = scan_docs[-1]
+            last_scanned_at = last_scan.get("scannedAt")
+            if isinstance(last_scanned_at, datetime):
+                response.headers["X-Next-Before"] = last_scanned_at.isoformat()
+                response.headers["X-Next-Before-Id"] = str(last_scan["_id"])
+        
         return scans
         
     except HTTPException:
@@ -141,7 +201,7 @@ async def scan_qr_code(
     qr_id: str,
     device_lat: float,
     device_lng: float,
-    current_guard: Dict[str, Any] = Depends(get_current_guard)
+    current_guard: Dict[str, Any] = Depends(get_current_guard_light)
 ):
     """
     Scan QR code and create scan event (simplified version)
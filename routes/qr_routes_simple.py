@@ -10,6 +10,7 @@ from fastapi.responses import StreamingResponse
 from typing import Dict, Any
 import logging
 from bson import ObjectId
+from pymongo import ReturnDocument
 import qrcode
 import io
 import base64
@@ -43,29 +44,27 @@ async def get_my_qr_image(
         qr_locations_collection = get_qr_locations_collection()
         supervisor_id_str = str(current_supervisor["_id"])
         
-        # Find or create QR location for this supervisor
-        existing_qr = await qr_locations_collection.find_one({"supervisorId": supervisor_id_str})
-        
-        if not existing_qr:
-            # Create new QR location automatically
-            default_label = f"Guard Point - {current_supervisor.get('email', 'Supervisor')}"
-            new_qr_location = {
-                "supervisorId": supervisor_id_str,
+        # Find or create QR location for this supervisor in one atomic round-trip
+        now = datetime.utcnow()
+        default_label = f"Guard Point - {current_supervisor.get('email', 'Supervisor')}"
+        qr_location = await qr_locations_collection.find_one_and_update(
+            {"supervisorId": supervisor_id_str},
+            {"$setOnInsert": {
                 "supervisorEmail": current_supervisor.get("email"),
                 "supervisorArea": current_supervisor.get("area", "Unknown"),
                 "label": default_label,
                 "lat": 0.0,
                 "lng": 0.0,
                 "isActive": True,
-                "createdAt": datetime.utcnow(),
-                "updatedAt": datetime.utcnow(),
+                "createdAt": now,
+                "updatedAt": now,
                 "firstScanUpdate": False
-            }
-            
-            result = await qr_locations_collection.insert_one(new_qr_location)
-            qr_id = str(result.inserted_id)
-        else:
-            qr_id = str(existing_qr["_id"])
+            }},
+            projection={"_id": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        qr_id = str(qr_location["_id"])
         
         # Generate QR code
         qr_content = f"GUARD_QR_{qr_id}"
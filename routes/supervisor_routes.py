@@ -4,20 +4,22 @@ SUPERVISOR role only - manage QR locations, view assigned guards, and access sca
 """
 
 from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi.responses import ORJSONResponse
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 import logging
 import io
-import os
+import orjson
+from pathlib import Path
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
 from bson import ObjectId
 
 # Import services and dependencies
-from services.auth_service import get_current_supervisor
+from services.auth_service import get_current_supervisor, get_current_supervisor_light
 from services.tomtom_service import tomtom_service
-from database import (
-    get_supervisors_collection, get_guards_collection, get_qr_locations_collection,
-    get_scan_events_collection, get_users_collection
-)
+from database import get_guards_collection, get_scan_events_collection, get_users_collection, build_state_filter
 from config import settings
 
 # Configure logging
@@ -27,19 +29,72 @@ logger = logging.getLogger(__name__)
 supervisor_router = APIRouter()
 
 
-@supervisor_router.get("/dashboard")
+class SupervisorJSONResponse(ORJSONResponse):
+    """orjson-encoded response that also serializes ObjectId values as strings"""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=str)
+
+
+# Excel report columns, in sheet order
+EXCEL_HEADERS = [
+    "Guard Name", "Guard Email", "Area/State", "Scan Date", "Scan Time",
+    "Timestamp IST", "Detailed Address", "Formatted Address", "GPS Latitude",
+    "GPS Longitude", "QR Code ID", "Location Updated", "Address Lookup Success"
+]
+
+# Fixed Excel report column widths (Guard Name ... Address Lookup Success)
+EXCEL_COLUMN_WIDTHS = {
+    "A": 22, "B": 28, "C": 16, "D": 12, "E": 10, "F": 22, "G": 40,
+    "H": 40, "I": 12, "J": 12, "K": 18, "L": 14, "M": 18
+}
+
+# Documents fetched per cursor round-trip while streaming a report
+EXCEL_CURSOR_BATCH_SIZE = 200
+
+
+async def report_rows(cursor, supervisor_state: str):
+    """
+    Yield Excel report rows (in EXCEL_HEADERS order) from a scan cursor
+    
+    Args:
+        cursor: Aggregation cursor of scans with resolved guard_name
+        supervisor_state: Area/state written into every row
+    """
+    async for scan in cursor:
+        # Split scan datetime into date and time columns
+        scanned_at = scan.get("scannedAt")
+        if scanned_at:
+            scan_date, _, scan_time = scanned_at.isoformat(sep=" ", timespec="seconds").partition(" ")
+        else:
+            scan_date = scan_time = ""
+        
+        yield [
+            scan["guard_name"],
+            scan.get("guardEmail", ""),
+            supervisor_state,
+            scan_date,
+            scan_time,
+            scan.get("timestampIST", ""),
+            scan.get("address", ""),
+            scan.get("formatted_address", ""),
+            scan.get("deviceLat", ""),
+            scan.get("deviceLng", ""),
+            scan.get("qrId", ""),
+            scan.get("locationUpdated", False),
+            scan.get("address_lookup_success", False)
+        ]
+
+
+@supervisor_router.get("/dashboard", response_class=SupervisorJSONResponse)
 async def get_supervisor_dashboard(current_supervisor: Dict[str, Any] = Depends(get_current_supervisor)):
     """
     Supervisor dashboard with assigned area statistics
     """
     try:
-        supervisors_collection = get_supervisors_collection()
-        guards_collection = get_guards_collection()
-        qr_locations_collection = get_qr_locations_collection()
-        scan_events_collection = get_scan_events_collection()
+        users_collection = get_users_collection()
         
-        if (supervisors_collection is None or guards_collection is None or 
-            qr_locations_collection is None or scan_events_collection is None):
+        if users_collection is None:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Database not available"
@@ -48,77 +103,99 @@ async def get_supervisor_dashboard(current_supervisor: Dict[str, Any] = Depends(
         supervisor_user_id = str(current_supervisor["_id"])  # This is the user ID from the users collection
         supervisor_state = current_supervisor["areaCity"]  # This is the state like "Maharashtra"
         
-        # Get assigned guards count (guards assigned to this supervisor)
-        assigned_guards = await guards_collection.count_documents({
-            "supervisorId": ObjectId(supervisor_user_id)
-        })
-        
-        # Get QR locations count  
-        qr_locations = await qr_locations_collection.count_documents({
-            "supervisorId": ObjectId(supervisor_user_id)
-        })
+        supervisor_id = ObjectId(supervisor_user_id)
         
         # Filter scans by supervisor's state - look for scans with addresses containing the state
         today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        week_start = today_start - timedelta(days=today_start.weekday())
         
         # Build scan filter for supervisor's specific state (e.g., "Maharashtra")
-        state_filter = {
-            "$or": [
-                {"address": {"$regex": supervisor_state, "$options": "i"}},
-                {"formatted_address": {"$regex": supervisor_state, "$options": "i"}}
-            ]
-        }
+        state_filter = build_state_filter(supervisor_state)
         
-        # Get today's scan statistics for this state
-        today_state_filter = {
-            "$and": [
-                {"scannedAt": {"$gte": today_start}},
-                state_filter
-            ]
-        }
-        today_scans = await scan_events_collection.count_documents(today_state_filter)
-        
-        # Get this week's scan statistics for this state
-        week_start = today_start - timedelta(days=today_start.weekday())
+        # This week's scans for this state; today's scans are a subset
         week_state_filter = {
             "$and": [
                 {"scannedAt": {"$gte": week_start}},
                 state_filter
             ]
         }
-        this_week_scans = await scan_events_collection.count_documents(week_state_filter)
         
-        # Get recent scan events - only from supervisor's state
-        recent_scans_cursor = scan_events_collection.find(state_filter).sort("scannedAt", -1).limit(10)
-        
-        recent_scans = await recent_scans_cursor.to_list(length=None)
-        
-        # Get guards with most activity - only from supervisor's state
-        guard_activity_pipeline = [
-            {"$match": {
-                "$and": [
-                    {"scannedAt": {"$gte": week_start}},
-                    state_filter
+        # One pass over this week's scans for both counters and the most active guards
+        week_stats_pipeline = [
+            {"$match": week_state_filter},
+            {"$facet": {
+                "this_week": [{"$count": "n"}],
+                "today": [
+                    {"$match": {"scannedAt": {"$gte": today_start}}},
+                    {"$count": "n"}
+                ],
+                "guard_activity": [
+                    {"$group": {
+                        "_id": "$guardEmail",
+                        "scan_count": {"$sum": 1}
+                    }},
+                    {"$sort": {"scan_count": -1}},
+                    {"$limit": 5},
+                    {"$project": {
+                        "guard_email": "$_id",
+                        "scan_count": 1,
+                        "_id": 0
+                    }}
                 ]
+            }}
+        ]
+        
+        # Fold every dashboard query into one aggregation anchored on the supervisor's user document
+        dashboard_pipeline = [
+            {"$match": {"_id": supervisor_id}},
+            {"$project": {"_id": 1}},
+            {"$lookup": {
+                "from": "guards",
+                "pipeline": [{"$match": {"supervisorId": supervisor_id}}, {"$count": "n"}],
+                "as": "assigned_guards"
             }},
-            {"$group": {
-                "_id": "$guardEmail",
-                "scan_count": {"$sum": 1}
+            {"$lookup": {
+                "from": "qr_locations",
+                "pipeline": [{"$match": {"supervisorId": supervisor_id}}, {"$count": "n"}],
+                "as": "qr_locations"
             }},
-            {"$sort": {"scan_count": -1}},
-            {"$limit": 5},
-            {"$project": {
-                "guard_email": "$_id",
-                "scan_count": 1,
-                "_id": 0
+            {"$lookup": {
+                "from": "scan_events",
+                "pipeline": week_stats_pipeline,
+                "as": "week_stats"
+            }},
+            {"$lookup": {
+                "from": "scan_events",
+                "pipeline": [
+                    {"$match": state_filter},
+                    {"$sort": {"scannedAt": -1}},
+                    {"$limit": 10}
+                ],
+                "as": "recent_scans"
             }}
         ]
         
-        guard_activity = await scan_events_collection.aggregate(guard_activity_pipeline).to_list(length=None)
+        dashboard = await users_collection.aggregate(dashboard_pipeline).to_list(length=1)
+        if not dashboard:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Supervisor not found"
+            )
+        dashboard = dashboard[0]
+        
+        assigned_guards = dashboard["assigned_guards"][0]["n"] if dashboard["assigned_guards"] else 0
+        qr_locations = dashboard["qr_locations"][0]["n"] if dashboard["qr_locations"] else 0
+        recent_scans = dashboard["recent_scans"]
+        
+        week_stats = dashboard["week_stats"][0]
+        this_week_scans = week_stats["this_week"][0]["n"] if week_stats["this_week"] else 0
+        today_scans = week_stats["today"][0]["n"] if week_stats["today"] else 0
+        guard_activity = week_stats["guard_activity"]
         
         # Guard activity already has proper structure, no ObjectId conversion needed
         
-        return {
+        # Return the response directly so FastAPI skips jsonable_encoder for the scan list
+        return SupervisorJSONResponse({
             "statistics": {
                 "assigned_guards": assigned_guards,
                 "qr_locations": qr_locations,
@@ -150,7 +227,7 @@ async def get_supervisor_dashboard(current_supervisor: Dict[str, Any] = Depends(
                 "state_full": current_supervisor.get("areaState"),
                 "country": current_supervisor.get("areaCountry")
             }
-        }
+        })
         
     except HTTPException:
         raise
@@ -162,6 +239,71 @@ async def get_supervisor_dashboard(current_supervisor: Dict[str, Any] = Depends(
         )
 
 
+@supervisor_router.get("/guards", response_class=SupervisorJSONResponse)
+async def get_supervisor_guards(
+    current_supervisor: Dict[str, Any] = Depends(get_current_supervisor_light),
+    active_only: bool = Query(True, description="Only include guards with active accounts")
+):
+    """
+    List guards assigned to the supervisor with their user account details
+    """
+    try:
+        guards_collection = get_guards_collection()
+        
+        if guards_collection is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Database not available"
+            )
+        
+        supervisor_id = ObjectId(str(current_supervisor["_id"]))
+        
+        # Join each guard with its user account in a single round-trip
+        pipeline = [
+            {"$match": {"supervisorId": supervisor_id}},
+            {"$lookup": {
+                "from": "users",
+                "localField": "userId",
+                "foreignField": "_id",
+                "as": "user"
+            }},
+            {"$unwind": "$user"}
+        ]
+        
+        # isActive lives on the user document, so it can only be filtered after the join
+        if active_only:
+            pipeline.append({"$match": {"user.isActive": True}})
+        
+        # Shape each row server-side so results can be returned as-is
+        pipeline.append({"$project": {
+            "_id": 0,
+            "guard_id": {"$toString": "$_id"},
+            "user_id": {"$ifNull": [{"$toString": "$userId"}, ""]},
+            "name": {"$ifNull": ["$user.name", ""]},
+            "email": {"$ifNull": ["$user.email", ""]},
+            "employee_code": {"$ifNull": ["$employeeCode", ""]},
+            "contact_number": {"$ifNull": ["$contactNumber", None]},
+            "is_active": {"$ifNull": ["$user.isActive", False]},
+            "created_at": {"$ifNull": ["$createdAt", None]}
+        }})
+        
+        guards = await guards_collection.aggregate(pipeline).to_list(length=None)
+        
+        return SupervisorJSONResponse({
+            "guards": guards,
+            "count": len(guards)
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Get supervisor guards error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get guards"
+        )
+
+
 @supervisor_router.post("/generate-excel-report")
 async def generate_excel_report(
     current_supervisor: Dict[str, Any] = Depends(get_current_supervisor),
@@ -172,11 +314,8 @@ async def generate_excel_report(
     """
     try:
         scan_events_collection = get_scan_events_collection()
-        guards_collection = get_guards_collection()
-        users_collection = get_users_collection()
         
-        if (scan_events_collection is None or guards_collection is None or 
-            users_collection is None):
+        if scan_events_collection is None:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Database not available"
@@ -194,12 +333,7 @@ async def generate_excel_report(
         state_filter = {
             "$and": [
                 {"scannedAt": {"$gte": start_date, "$lte": end_date}},
-                {
-                    "$or": [
-                        {"address": {"$regex": supervisor_state, "$options": "i"}},
-                        {"formatted_address": {"$regex": supervisor_state, "$options": "i"}}
-                    ]
-                }
+                build_state_filter(supervisor_state)
             ]
         }
         
@@ -255,116 +389,80 @@ async def generate_excel_report(
                 }
             }},
             
+            # Resolve guard name server-side: user name, else email username
+            {"$set": {
+                "guard_name": {
+                    "$ifNull": [
+                        {"$arrayElemAt": ["$user_data.name", 0]},
+                        {
+                            "$cond": {
+                                "if": {"$gt": [{"$strLenCP": {"$ifNull": ["$guardEmail", ""]}}, 0]},
+                                "then": {"$arrayElemAt": [{"$split": ["$guardEmail", "@"]}, 0]},
+                                "else": "Unknown Guard"
+                            }
+                        }
+                    ]
+                }
+            }},
+            
             # Clean up unnecessary fields
             {"$project": {
                 "user_data_by_email": 0,
-                "user_data_by_id": 0
+                "user_data_by_id": 0,
+                "user_data": 0,
+                "guard_data": 0
             }}
         ]
         
-        scans_with_details = await scan_events_collection.aggregate(pipeline).to_list(length=None)
+        # Generate filename
+        filename = f"supervisor_report_{supervisor_state}_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.xlsx"
+        
+        # Stream rows from the cursor into a write-only workbook
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet(f'{supervisor_state}_Scans')
+        
+        # Set column widths
+        for column_letter, width in EXCEL_COLUMN_WIDTHS.items():
+            worksheet.column_dimensions[column_letter].width = width
         
-        if not scans_with_details:
+        header_cells = []
+        for header in EXCEL_HEADERS:
+            cell = WriteOnlyCell(worksheet, value=header)
+            cell.font = Font(bold=True)
+            header_cells.append(cell)
+        worksheet.append(header_cells)
+        
+        total_scans = 0
+        cursor = scan_events_collection.aggregate(pipeline, batchSize=EXCEL_CURSOR_BATCH_SIZE)
+        async for row_data in report_rows(cursor, supervisor_state):
+            worksheet.append(row_data)
+            total_scans += 1
+        
+        if not total_scans:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"No scan data found for {supervisor_state} in the last {days_back} days"
             )
         
-        # Prepare Excel data
-        excel_data = []
-        for scan in scans_with_details:
-            # Get guard name from users collection
-            guard_name = "Unknown Guard"
-            guard_email = scan.get("guardEmail", "")
-            
-            # First try to get name from user_data (matched by email)
-            if scan.get("user_data") and len(scan["user_data"]) > 0:
-                guard_name = scan["user_data"][0].get("name", "Unknown Guard")
-            
-            # If no user_data, try to get from guard_data (if guardId exists)
-            elif scan.get("guard_data") and len(scan["guard_data"]) > 0:
-                guard_record = scan["guard_data"][0]
-                # Get user details from the guard's userId
-                if guard_record.get("userId"):
-                    try:
-                        user_details = await users_collection.find_one({"_id": guard_record["userId"]})
-                        if user_details:
-                            guard_name = user_details.get("name", "Unknown Guard")
-                            if not guard_email:  # If email not in scan, get from user
-                                guard_email = user_details.get("email", "")
-                    except Exception as e:
-                        logger.warning(f"Could not fetch user details: {e}")
-            
-            # Final fallback - use email username if nothing else works
-            if guard_name == "Unknown Guard" and guard_email:
-                guard_name = guard_email.split("@")[0]  # Use email username as fallback
-            
-            # Format the data row
-            row_data = {
-                "Guard Name": guard_name,
-                "Guard Email": scan.get("guardEmail", ""),
-                "Area/State": supervisor_state,
-                "Scan Date": scan.get("scannedAt", "").strftime("%Y-%m-%d") if scan.get("scannedAt") else "",
-                "Scan Time": scan.get("scannedAt", "").strftime("%H:%M:%S") if scan.get("scannedAt") else "",
-                "Timestamp IST": scan.get("timestampIST", ""),
-                "Detailed Address": scan.get("address", ""),
-                "Formatted Address": scan.get("formatted_address", ""),
-                "GPS Latitude": scan.get("deviceLat", ""),
-                "GPS Longitude": scan.get("deviceLng", ""),
-                "QR Code ID": scan.get("qrId", ""),
-                "Location Updated": scan.get("locationUpdated", False),
-                "Address Lookup Success": scan.get("address_lookup_success", False)
-            }
-            excel_data.append(row_data)
-        
-        # Generate filename
-        filename = f"supervisor_report_{supervisor_state}_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.xlsx"
-        
         # Create Excel file in memory
-        import io
-        import pandas as pd
-        
         output = io.BytesIO()
-        
-        # Create DataFrame
-        df = pd.DataFrame(excel_data)
-        
-        # Write to Excel with formatting
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name=f'{supervisor_state}_Scans', index=False)
-            
-            # Get the workbook and worksheet
-            worksheet = writer.sheets[f'{supervisor_state}_Scans']
-            
-            # Auto-adjust column widths
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
+        workbook.save(output)
         
         output.seek(0)
         
         # Save Excel file to the excel_reports folder
-        excel_folder = "excel_reports"
+        excel_folder = Path("excel_reports")
         try:
-            os.makedirs(excel_folder, exist_ok=True)
+            excel_folder.mkdir(exist_ok=True)
         except Exception as e:
             logger.error(f"Could not create excel_reports folder: {e}")
             # Fallback to current directory
-            excel_folder = "."
+            excel_folder = Path(".")
         
         # Save the Excel file locally
-        file_path = os.path.join(excel_folder, filename).replace("/", "\\")
+        file_path = excel_folder / filename
         try:
-            with open(file_path, 'wb') as f:
-                f.write(output.getvalue())
+            file_path.write_bytes(output.getvalue())
             logger.info(f"Excel file saved successfully: {file_path}")
         except Exception as e:
             logger.error(f"Error saving Excel file: {e}")
@@ -375,13 +473,13 @@ async def generate_excel_report(
         
         # Create a README file with file info
         try:
-            readme_path = os.path.join(excel_folder, f"README_{filename.replace('.xlsx', '.txt')}").replace("/", "\\")
-            with open(readme_path, 'w') as f:
+            readme_path = excel_folder / f"README_{file_path.stem}.txt"
+            with readme_path.open('w') as f:
                 f.write(f"Supervisor Report Generated\n")
                 f.write(f"Generated by: {supervisor_email}\n")
                 f.write(f"Area: {supervisor_state}\n")
                 f.write(f"Date Range: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}\n")
-                f.write(f"Total Scans: {len(excel_data)}\n")
+                f.write(f"Total Scans: {total_scans}\n")
                 f.write(f"Generated at: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC\n")
                 f.write(f"File: {filename}\n")
         except Exception as e:
@@ -395,7 +493,7 @@ async def generate_excel_report(
                 "supervisor_email": supervisor_email,
                 "area": supervisor_state,
                 "date_range": f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}",
-                "total_scans": len(excel_data),
+                "total_scans": total_scans,
                 "filename": filename,
                 "local_path": f"\\{excel_folder}\\{filename}",
                 "folder_path": f"\\{excel_folder}"
@@ -7,10 +7,14 @@ from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from typing import Optional, Dict, Any
 import logging
+import hashlib
+import time
 from datetime import datetime
 
+from config import settings
 from services.jwt_service import jwt_service
-from database import get_users_collection, get_guards_collection, get_supervisors_collection
+from services.ttl_cache import TTLCache
+from database import get_users_collection
 from models import UserRole, UserResponse
 
 logger = logging.getLogger(__name__)
@@ -19,6 +23,62 @@ logger = logging.getLogger(__name__)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
 
+# Plain role strings, so per-request role checks compare str to str
+_ROLE_ADMIN = UserRole.ADMIN.value
+_ROLE_SUPERVISOR = UserRole.SUPERVISOR.value
+_ROLE_GUARD = UserRole.GUARD.value
+_ADMIN_OR_SUPERVISOR = frozenset((_ROLE_ADMIN, _ROLE_SUPERVISOR))
+
+
+# In-process cache of active user documents by user_id
+_user_cache = TTLCache(settings.USER_CACHE_MAX_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+
+def _get_cached_user(user_id: str) -> Optional[Dict[str, Any]]:
+    """Return a copy of the cached user document if present and not expired"""
+    user = _user_cache.get(user_id)
+    return dict(user) if user is not None else None
+
+
+def _cache_user(user_id: str, user: Dict[str, Any]) -> None:
+    """Cache a copy of a user document"""
+    _user_cache.set(user_id, dict(user))
+
+
+# Verified access token payloads by blake2b(token)
+_token_cache = TTLCache(settings.USER_CACHE_MAX_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+
+def _token_cache_key(token: str) -> bytes:
+    """Fixed-size cache key for a raw token"""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+def _cache_payload(cache_key: bytes, payload: Dict[str, Any]) -> None:
+    """Cache a verified payload, never past the token's own expiry"""
+    ttl = settings.USER_CACHE_TTL_SECONDS
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        ttl = min(ttl, exp - time.time())
+    _token_cache.set(cache_key, payload, ttl)
+
+
+def invalidate_user_cache(user_id: str) -> None:
+    """
+    Drop a user from the authenticated user and token payload caches
+    
+    Call after logout or any change to the user's role or active status.
+    """
+    user_id = str(user_id)
+    for cache_key in (user_id, f"{user_id}:supervisor", f"{user_id}:guard"):
+        _user_cache.pop(cache_key)
+    
+    # Logout is rare, so a scan of the token cache is acceptable here
+    stale_tokens = [key for key, payload in _token_cache.items() if payload.get("user_id") == user_id]
+    for key in stale_tokens:
+        _token_cache.pop(key)
+
+
 class AuthenticationError(HTTPException):
     """Custom authentication error"""
     def __init__(self, detail: str):
@@ -38,6 +98,34 @@ class AuthorizationError(HTTPException):
         )
 
 
+def _verify_access_token(token: Optional[str]) -> Dict[str, Any]:
+    """
+    Verify an access token and return its payload
+    
+    Raises:
+        AuthenticationError: If token is missing, invalid or has no user_id
+    """
+    if not token:
+        raise AuthenticationError("Authentication required")
+    
+    # Repeat requests with the same token skip signature verification
+    cache_key = _token_cache_key(token)
+    payload = _token_cache.get(cache_key)
+    if payload is not None:
+        return payload
+    
+    # Verify JWT token
+    payload = jwt_service.verify_token(token, "access")
+    if not payload:
+        raise AuthenticationError("Invalid or expired token")
+    
+    if not payload.get("user_id"):
+        raise AuthenticationError("Invalid token payload")
+    
+    _cache_payload(cache_key, payload)
+    return payload
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
     """
     Get current authenticated user from JWT token
@@ -51,17 +139,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any
     Raises:
         AuthenticationError: If token is invalid or user not found
     """
-    if not token:
-        raise AuthenticationError("Authentication required")
+    payload = _verify_access_token(token)
+    user_id = payload["user_id"]
     
-    # Verify JWT token
-    payload = jwt_service.verify_token(token, "access")
-    if not payload:
-        raise AuthenticationError("Invalid or expired token")
-    
-    user_id = payload.get("user_id")
-    if not user_id:
-        raise AuthenticationError("Invalid token payload")
+    # Reuse a recently fetched user document
+    user = _get_cached_user(user_id)
+    if user is not None:
+        return user
     
     # Get user from database
     users_collection = get_users_collection()
@@ -78,7 +162,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any
     except Exception:
         raise AuthenticationError("Invalid user ID format")
     
-    user = await users_collection.find_one({"_id": user_object_id})
+    user = await users_collection.find_one({"_id": user_object_id}, {"passwordHash": 0})
     if not user:
         raise AuthenticationError("User not found")
     
@@ -86,6 +170,40 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any
     if not user.get("isActive", False):
         raise AuthenticationError("Account is not active")
     
+    _cache_user(user_id, user)
+    return user
+
+
+async def get_current_user_light(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+    """
+    Get current user identity from the verified JWT payload without a database lookup
+    
+    Only _id, role, email and name are available, and isActive is not re-checked
+    until the token expires. Use get_current_user for handlers that need the full,
+    fresh user document.
+    
+    Args:
+        token: JWT token from OAuth2 scheme
+        
+    Returns:
+        Minimal user dict built from the token payload
+        
+    Raises:
+        AuthenticationError: If token is invalid
+    """
+    payload = _verify_access_token(token)
+    
+    from bson import ObjectId
+    try:
+        user_object_id = ObjectId(payload["user_id"])
+    except Exception:
+        raise AuthenticationError("Invalid user ID format")
+    
+    user = {"_id": user_object_id, "role": payload.get("role")}
+    # Tokens issued before these claims existed lack them; leave the keys out so handler defaults apply
+    for claim in ("email", "name"):
+        if claim in payload:
+            user[claim] = payload[claim]
     return user
 
 
@@ -109,7 +227,7 @@ async def get_current_admin(current_user: Dict[str, Any] = Depends(get_current_u
     Raises:
         AuthorizationError: If user is not admin
     """
-    if current_user.get("role") != UserRole.ADMIN:
+    if current_user.get("role") != _ROLE_ADMIN:
         raise AuthorizationError("Admin access required")
     
     return current_user
@@ -128,7 +246,7 @@ async def get_current_supervisor(current_user: Dict[str, Any] = Depends(get_curr
     Raises:
         AuthorizationError: If user is not supervisor
     """
-    if current_user.get("role") != UserRole.SUPERVISOR:
+    if current_user.get("role") != _ROLE_SUPERVISOR:
         raise AuthorizationError("Supervisor access required")
     
     return current_user
@@ -147,7 +265,37 @@ async def get_current_guard(current_user: Dict[str, Any] = Depends(get_current_u
     Raises:
         AuthorizationError: If user is not guard
     """
-    if current_user.get("role") != UserRole.GUARD:
+    if current_user.get("role") != _ROLE_GUARD:
+        raise AuthorizationError("Guard access required")
+    
+    return current_user
+
+
+async def get_current_admin_light(current_user: Dict[str, Any] = Depends(get_current_user_light)) -> Dict[str, Any]:
+    """
+    Require an ADMIN token, without loading the user document
+    """
+    if current_user.get("role") != _ROLE_ADMIN:
+        raise AuthorizationError("Admin access required")
+    
+    return current_user
+
+
+async def get_current_supervisor_light(current_user: Dict[str, Any] = Depends(get_current_user_light)) -> Dict[str, Any]:
+    """
+    Require a SUPERVISOR token, without loading the user document
+    """
+    if current_user.get("role") != _ROLE_SUPERVISOR:
+        raise AuthorizationError("Supervisor access required")
+    
+    return current_user
+
+
+async def get_current_guard_light(current_user: Dict[str, Any] = Depends(get_current_user_light)) -> Dict[str, Any]:
+    """
+    Require a GUARD token, without loading the user document
+    """
+    if current_user.get("role") != _ROLE_GUARD:
         raise AuthorizationError("Guard access required")
     
     return current_user
@@ -166,68 +314,100 @@ async def get_admin_or_supervisor(current_user: Dict[str, Any] = Depends(get_cur
     Raises:
         AuthorizationError: If user is neither admin nor supervisor
     """
-    if current_user.get("role") not in [UserRole.ADMIN, UserRole.SUPERVISOR]:
+    if current_user.get("role") not in _ADMIN_OR_SUPERVISOR:
         raise AuthorizationError("Admin or Supervisor access required")
     
     return current_user
 
 
-async def get_supervisor_with_details(current_user: Dict[str, Any] = Depends(get_current_supervisor)) -> Dict[str, Any]:
+async def _get_user_with_role_record(token: Optional[str], role: UserRole, collection_name: str, record_field: str) -> Dict[str, Any]:
     """
-    Get supervisor with complete details including supervisor record
+    Load the user and its role-specific record with a single $lookup aggregation
     
     Args:
-        current_user: Current authenticated supervisor user
+        token: JWT token from OAuth2 scheme
+        role: Role the user must have
+        collection_name: Collection holding the role record, keyed by userId
+        record_field: Field the role record is attached under
         
     Returns:
-        User document with supervisor details
+        User document with the role record attached
     """
-    supervisors_collection = get_supervisors_collection()
-    if supervisors_collection is None:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Database not available"
-        )
+    payload = _verify_access_token(token)
+    user_id = payload["user_id"]
+    cache_key = f"{user_id}:{record_field}"
     
-    supervisor_record = await supervisors_collection.find_one({"userId": str(current_user["_id"])})
-    if not supervisor_record:
+    user = _get_cached_user(cache_key)
+    if user is None:
+        users_collection = get_users_collection()
+        if users_collection is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Database not available"
+            )
+        
+        from bson import ObjectId
+        try:
+            user_object_id = ObjectId(user_id)
+        except Exception:
+            raise AuthenticationError("Invalid user ID format")
+        
+        pipeline = [
+            {"$match": {"_id": user_object_id}},
+            {"$project": {"passwordHash": 0}},
+            {"$lookup": {
+                "from": collection_name,
+                "localField": "_id",
+                "foreignField": "userId",
+                "as": record_field
+            }},
+            {"$unwind": {"path": f"${record_field}", "preserveNullAndEmptyArrays": True}}
+        ]
+        users = await users_collection.aggregate(pipeline).to_list(length=1)
+        if not users:
+            raise AuthenticationError("User not found")
+        
+        user = users[0]
+        if not user.get("isActive", False):
+            raise AuthenticationError("Account is not active")
+    
+    if user.get("role") != role.value:
+        raise AuthorizationError(f"{role.value.capitalize()} access required")
+    
+    if not user.get(record_field):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Supervisor record not found"
+            detail=f"{role.value.capitalize()} record not found"
         )
     
-    # Add supervisor details to user object
-    current_user["supervisor"] = supervisor_record
-    return current_user
+    _cache_user(cache_key, user)
+    return user
+
+
+async def get_supervisor_with_details(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+    """
+    Get supervisor with complete details including supervisor record
+    
+    Args:
+        token: JWT token from OAuth2 scheme
+        
+    Returns:
+        User document with supervisor details
+    """
+    return await _get_user_with_role_record(token, UserRole.SUPERVISOR, "supervisors", "supervisor")
 
 
-async def get_guard_with_details(current_user: Dict[str, Any] = Depends(get_current_guard)) -> Dict[str, Any]:
+async def get_guard_with_details(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
     """
     Get guard with complete details including guard record
     
     Args:
-        current_user: Current authenticated guard user
+        token: JWT token from OAuth2 scheme
         
     Returns:
         User document with guard details
     """
-    guards_collection = get_guards_collection()
-    if guards_collection is None:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Database not available"
-        )
-    
-    guard_record = await guards_collection.find_one({"userId": str(current_user["_id"])})
-    if not guard_record:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Guard record not found"
-        )
-    
-    # Add guard details to user object
-    current_user["guard"] = guard_record
-    return current_user
+    return await _get_user_with_role_record(token, UserRole.GUARD, "guards", "guard")
 
 
 # Optional authentication (for some endpoints that work with or without auth)
@@ -260,11 +440,14 @@ def require_roles(*allowed_roles: UserRole):
     Returns:
         FastAPI dependency function
     """
+    # Normalize once so each request does a single set lookup on the stored role string
+    role_names = [getattr(role, "value", role) for role in allowed_roles]
+    allowed = frozenset(role_names)
+    error_message = f"Access denied. Required roles: {', '.join(role_names)}"
+    
     async def role_checker(current_user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
-        user_role = current_user.get("role")
-        if user_role not in allowed_roles:
-            role_names = [role.value for role in allowed_roles]
-            raise AuthorizationError(f"Access denied. Required roles: {', '.join(role_names)}")
+        if current_user.get("role") not in allowed:
+            raise AuthorizationError(error_message)
         return current_user
     
     return role_checker
@@ -284,7 +467,8 @@ async def get_client_ip(request: Request) -> str:
     # Check for forwarded headers first (for reverse proxies)
     forwarded_for = request.headers.get("X-Forwarded-For")
     if forwarded_for:
-        return forwarded_for.split(",")[0].strip()
+        # Only the first hop is the client; partition avoids splitting the whole chain
+        return forwarded_for.partition(",")[0].strip()
     
     real_ip = request.headers.get("X-Real-IP")
     if real_ip:
@@ -318,6 +502,8 @@ async def revoke_user_tokens(user_id: str) -> bool:
             {"$set": {"revoked": True, "updatedAt": datetime.utcnow()}}
         )
         
+        invalidate_user_cache(user_id)
+        
         logger.info(f"Revoked {result.modified_count} refresh tokens for user {user_id}")
         return True
         
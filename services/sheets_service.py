@@ -3,53 +3,69 @@ Google Sheets service for logging scan events
 Handles sheet creation, data appending, and access control
 """
 
-import gspread
-from google.oauth2.service_account import Credentials
 from typing import List, Dict, Any, Optional
 import logging
+from functools import cache, lru_cache
 from datetime import datetime
-import pytz
-from config import settings
+from services.sheets_service_new import (
+    SHEET_HEADERS,
+    SheetSchema,
+    SheetsService,
+    format_timestamp_ist,
+    get_sheets_service as get_sheets_writer
+)
 
 logger = logging.getLogger(__name__)
 
 
+# Column headers shared by supervisor and area tabs (row data follows this order)
+SCAN_LOG_HEADERS = SHEET_HEADERS[SheetSchema.SCAN_LOG]
+
+# Header row formatting per tab type
+SUPERVISOR_HEADER_FORMAT = {
+    'textFormat': {'bold': True},
+    'backgroundColor': {'red': 0.9, 'green': 0.9, 'blue': 0.9}
+}
+AREA_HEADER_FORMAT = {
+    'textFormat': {'bold': True},
+    'backgroundColor': {'red': 0.8, 'green': 0.9, 'blue': 1.0}
+}
+
+
+# Upper-cases ASCII letters and turns spaces into underscores in one pass
+_TAB_NAME_TRANSLATE = str.maketrans({
+    **{c: c.upper() for c in "abcdefghijklmnopqrstuvwxyz"},
+    " ": "_"
+})
+
+
+@lru_cache(maxsize=4096)
+def supervisor_tab_name(supervisor_code: str, area_city: str) -> str:
+    """Tab name format: SUP_<SupervisorCode>_<City>"""
+    return f"SUP_{supervisor_code}_{area_city}".translate(_TAB_NAME_TRANSLATE)
+
+
+@lru_cache(maxsize=4096)
+def area_tab_name(area_city: str) -> str:
+    """Area tab name: the city upper-cased, spaces as underscores"""
+    return area_city.translate(_TAB_NAME_TRANSLATE)
+
+
 class GoogleSheetsService:
-    """Google Sheets integration for scan event logging"""
+    """
+    Supervisor and area scan logging on top of the shared SheetsService writer
     
-    def __init__(self):
-        self.credentials_file = settings.GOOGLE_SHEETS_CREDENTIALS_FILE
-        self.spreadsheet_id = settings.GOOGLE_SHEETS_SPREADSHEET_ID
-        self.timezone = pytz.timezone(settings.TIMEZONE)
-        
-        self.client = None
-        self.spreadsheet = None
-        
-        if not self.credentials_file or not self.spreadsheet_id:
-            logger.warning("⚠️ Google Sheets not configured. Scan logging to sheets disabled.")
-            return
-        
-        try:
-            # Setup Google Sheets client
-            scopes = [
-                'https://www.googleapis.com/auth/spreadsheets',
-                'https://www.googleapis.com/auth/drive'
-            ]
-            
-            credentials = Credentials.from_service_account_file(
-                self.credentials_file, 
-                scopes=scopes
-            )
-            
-            self.client = gspread.authorize(credentials)
-            self.spreadsheet = self.client.open_by_key(self.spreadsheet_id)
-            
-            logger.info("✅ Google Sheets service initialized successfully")
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to initialize Google Sheets service: {e}")
-            self.client = None
-            self.spreadsheet = None
+    Rows go through the writer's queue, so both tabs are appended in the
+    background batches alongside the real-time scan rows.
+    """
+    
+    def __init__(self, writer: SheetsService):
+        self.writer = writer
+        self.timezone = writer.timezone
+    
+    @property
+    def spreadsheet(self) -> Optional[Any]:
+        return self.writer.spreadsheet
     
     def format_timestamp_ist(self, utc_datetime: datetime) -> str:
         """
@@ -61,11 +77,7 @@ class GoogleSheetsService:
         Returns:
             Formatted IST timestamp string (DD-MM-YYYY HH:mm:ss)
         """
-        # Convert UTC to IST
-        utc_dt = utc_datetime.replace(tzinfo=pytz.UTC)
-        ist_dt = utc_dt.astimezone(self.timezone)
-        
-        return ist_dt.strftime("%d-%m-%Y %H:%M:%S")
+        return format_timestamp_ist(utc_datetime)
     
     def get_or_create_supervisor_tab(self, supervisor_code: str, area_city: str) -> Optional[Any]:
         """
@@ -78,59 +90,9 @@ class GoogleSheetsService:
         Returns:
             Worksheet object or None if error
         """
-        if not self.spreadsheet:
-            return None
-        
-        try:
-            # Tab name format: SUP_<SupervisorCode>_<City>
-            tab_name = f"SUP_{supervisor_code}_{area_city}".replace(" ", "_").upper()
-            
-            # Try to get existing worksheet
-            try:
-                worksheet = self.spreadsheet.worksheet(tab_name)
-                return worksheet
-            except gspread.WorksheetNotFound:
-                pass
-            
-            # Create new worksheet
-            worksheet = self.spreadsheet.add_worksheet(title=tab_name, rows=1000, cols=16)
-            
-            # Add headers
-            headers = [
-                "timestamp_ist",
-                "supervisor_id", 
-                "supervisor_name",
-                "supervisor_area_city",
-                "guard_id",
-                "guard_name",
-                "qr_id",
-                "qr_label",
-                "qr_lat",
-                "qr_lng", 
-                "device_lat",
-                "device_lng",
-                "distance_meters",
-                "within_radius",
-                "reverse_geocoded_address",
-                "notes"
-            ]
-            
-            # Format headers
-            worksheet.insert_row(headers, 1)
-            worksheet.format('A1:P1', {
-                'textFormat': {'bold': True},
-                'backgroundColor': {'red': 0.9, 'green': 0.9, 'blue': 0.9}
-            })
-            
-            # Freeze header row
-            worksheet.freeze(rows=1)
-            
-            logger.info(f"✅ Created new supervisor tab: {tab_name}")
-            return worksheet
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to create supervisor tab: {e}")
-            return None
+        # Tab name format: SUP_<SupervisorCode>_<City>
+        tab_name = supervisor_tab_name(supervisor_code, area_city)
+        return self.writer.get_or_create_worksheet(tab_name, SheetSchema.SCAN_LOG, SUPERVISOR_HEADER_FORMAT)
     
     def get_or_create_area_tab(self, area_city: str) -> Optional[Any]:
         """
@@ -142,59 +104,9 @@ class GoogleSheetsService:
         Returns:
             Worksheet object or None if error
         """
-        if not self.spreadsheet:
-            return None
-        
-        try:
-            # Tab name format: AREA_<City>
-            tab_name = area_city.replace(" ", "_").upper()
-            
-            # Try to get existing worksheet
-            try:
-                worksheet = self.spreadsheet.worksheet(tab_name)
-                return worksheet
-            except gspread.WorksheetNotFound:
-                pass
-            
-            # Create new worksheet
-            worksheet = self.spreadsheet.add_worksheet(title=tab_name, rows=1000, cols=16)
-            
-            # Add headers (same as supervisor tabs)
-            headers = [
-                "timestamp_ist",
-                "supervisor_id", 
-                "supervisor_name",
-                "supervisor_area_city",
-                "guard_id",
-                "guard_name",
-                "qr_id",
-                "qr_label",
-                "qr_lat",
-                "qr_lng", 
-                "device_lat",
-                "device_lng",
-                "distance_meters",
-                "within_radius",
-                "reverse_geocoded_address",
-                "notes"
-            ]
-            
-            # Format headers
-            worksheet.insert_row(headers, 1)
-            worksheet.format('A1:P1', {
-                'textFormat': {'bold': True},
-                'backgroundColor': {'red': 0.8, 'green': 0.9, 'blue': 1.0}
-            })
-            
-            # Freeze header row
-            worksheet.freeze(rows=1)
-            
-            logger.info(f"✅ Created new area tab: {tab_name}")
-            return worksheet
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to create area tab: {e}")
-            return None
+        # Tab name format: AREA_<City>
+        tab_name = area_tab_name(area_city)
+        return self.writer.get_or_create_worksheet(tab_name, SheetSchema.SCAN_LOG, AREA_HEADER_FORMAT)
     
     async def append_scan_event(self, scan_data: Dict[str, Any]) -> bool:
         """
@@ -204,7 +116,7 @@ class GoogleSheetsService:
             scan_data: Complete scan event data with all required fields
             
         Returns:
-            True if successful, False otherwise
+            True if queued, False otherwise
         """
         if not self.spreadsheet:
             logger.warning("Google Sheets not available, skipping scan log")
@@ -231,27 +143,29 @@ class GoogleSheetsService:
                 scan_data.get("notes", "")
             ]
             
-            # Append to supervisor tab
+            # Supervisor tab, plus area tab for admin view
             supervisor_code = scan_data.get("supervisor_code", "UNKNOWN")
             area_city = scan_data.get("supervisor_area_city", "UNKNOWN")
             
-            supervisor_worksheet = self.get_or_create_supervisor_tab(supervisor_code, area_city)
-            if supervisor_worksheet:
-                supervisor_worksheet.append_row(row_data)
-                logger.info(f"✅ Appended scan to supervisor tab: SUP_{supervisor_code}_{area_city}")
-            
-            # Append to area tab (for admin view)
-            area_worksheet = self.get_or_create_area_tab(area_city)
-            if area_worksheet:
-                area_worksheet.append_row(row_data)
-                logger.info(f"✅ Appended scan to area tab: {area_city}")
-            
-            return True
+            supervisor_queued = self.writer.enqueue_update(
+                supervisor_tab_name(supervisor_code, area_city), row_data,
+                SheetSchema.SCAN_LOG, SUPERVISOR_HEADER_FORMAT
+            )
+            area_queued = self.writer.enqueue_update(
+                area_tab_name(area_city), row_data,
+                SheetSchema.SCAN_LOG, AREA_HEADER_FORMAT
+            )
+            return supervisor_queued and area_queued
             
         except Exception as e:
             logger.error(f"❌ Failed to append scan event to sheets: {e}")
             return False
     
+    def _tab_url(self, tab_name: str) -> str:
+        """Spreadsheet URL pointing at the tab's GID"""
+        worksheet = self.writer.get_worksheet(tab_name)
+        return f"https://docs.google.com/spreadsheets/d/{self.spreadsheet.id}#gid={worksheet.id}"
+    
     def get_supervisor_sheet_url(self, supervisor_code: str, area_city: str) -> Optional[str]:
         """
         Get URL for supervisor's sheet tab
@@ -267,15 +181,7 @@ class GoogleSheetsService:
             return None
         
         try:
-            tab_name = f"SUP_{supervisor_code}_{area_city}".replace(" ", "_").upper()
-            worksheet = self.spreadsheet.worksheet(tab_name)
-            
-            # Construct URL with sheet ID and tab GID
-            base_url = f"https://docs.google.com/spreadsheets/d/{self.spreadsheet_id}"
-            tab_url = f"{base_url}#gid={worksheet.id}"
-            
-            return tab_url
-            
+            return self._tab_url(supervisor_tab_name(supervisor_code, area_city))
         except Exception as e:
             logger.error(f"Failed to get supervisor sheet URL: {e}")
             return None
@@ -294,15 +200,7 @@ class GoogleSheetsService:
             return None
         
         try:
-            tab_name = area_city.replace(" ", "_").upper()
-            worksheet = self.spreadsheet.worksheet(tab_name)
-            
-            # Construct URL with sheet ID and tab GID
-            base_url = f"https://docs.google.com/spreadsheets/d/{self.spreadsheet_id}"
-            tab_url = f"{base_url}#gid={worksheet.id}"
-            
-            return tab_url
-            
+            return self._tab_url(area_tab_name(area_city))
         except Exception as e:
             logger.error(f"Failed to get area sheet URL: {e}")
             return None
@@ -314,30 +212,18 @@ class GoogleSheetsService:
         Returns:
             Health status information
         """
-        if not self.client or not self.spreadsheet:
-            return {
-                "status": "disabled",
-                "message": "Google Sheets service not configured"
-            }
-        
-        try:
-            # Test access by getting spreadsheet info
-            sheet_info = self.spreadsheet.title
-            worksheet_count = len(self.spreadsheet.worksheets())
-            
-            return {
-                "status": "healthy",
-                "message": "Google Sheets service operational",
-                "spreadsheet_title": sheet_info,
-                "worksheet_count": worksheet_count
-            }
-            
-        except Exception as e:
-            return {
-                "status": "error",
-                "message": f"Google Sheets service error: {str(e)}"
-            }
+        return self.writer.get_sheet_health()
 
 
-# Global Google Sheets service instance
-sheets_service = GoogleSheetsService()
+@cache
+def get_sheets_service() -> Optional[GoogleSheetsService]:
+    """
+    Get the shared supervisor/area logging service, constructing it on first use
+    
+    Returns:
+        Service instance, or None when ENABLE_SHEETS is off
+    """
+    writer = get_sheets_writer()
+    if writer is None:
+        return None
+    return GoogleSheetsService(writer)
@@ -5,42 +5,134 @@ Enhanced with background updates and queue system for real-time data sync
 
 import gspread
 import asyncio
+import hashlib
+import json
 import logging
+import shutil
+import sys
+import threading
 from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
 from typing import Dict, Any, Optional, List
 from google.auth.exceptions import DefaultCredentialsError
-from queue import Queue
-import threading
-import time
+from collections import defaultdict
+from enum import Enum
+from functools import cache, lru_cache
+from pathlib import Path
 
 from config import settings
+from services.sheets_client import create_sheets_client_from_file, call_with_retry, add_worksheet_with_header
 
 logger = logging.getLogger(__name__)
 
+# Timestamp format used in sheet rows (DD-MM-YYYY HH:mm:ss)
+IST_TIMESTAMP_FORMAT = "%d-%m-%Y %H:%M:%S"
+IST_TIMEZONE = ZoneInfo(settings.TIMEZONE)
+
+
+@lru_cache(maxsize=256)
+def _ist_fmt(epoch: int) -> str:
+    """IST sheet timestamp for a whole epoch second (scans in a batch often share one)"""
+    return datetime.fromtimestamp(epoch, IST_TIMEZONE).strftime(IST_TIMESTAMP_FORMAT)
+
+
+def format_timestamp_ist(utc_datetime: datetime) -> str:
+    """
+    Format UTC datetime to IST string for sheets
+    
+    Args:
+        utc_datetime: UTC datetime object (naive values are treated as UTC)
+        
+    Returns:
+        Formatted IST timestamp string (DD-MM-YYYY HH:mm:ss)
+    """
+    return _ist_fmt(int(utc_datetime.replace(tzinfo=timezone.utc).timestamp()))
+
+
+class SheetSchema(str, Enum):
+    """Column layouts written through the shared update queue"""
+    SCAN_EVENTS = "scan_events"  # Real-time scan rows (<AREA>_SCANS tabs)
+    SCAN_LOG = "scan_log"  # Supervisor and area report rows (SUP_* and <CITY> tabs)
+
+
+# Header row per schema (row data follows this order)
+SHEET_HEADERS = {
+    SheetSchema.SCAN_EVENTS: [
+        "Timestamp (IST)", "Guard Name", "Guard Email", "Employee Code",
+        "Supervisor Name", "Supervisor Email", "Area/City", "QR ID",
+        "Location Label", "Latitude", "Longitude", "Address",
+        "Distance from QR (m)", "Within Radius", "Scan Status", "Notes"
+    ],
+    SheetSchema.SCAN_LOG: [
+        "timestamp_ist",
+        "supervisor_id",
+        "supervisor_name",
+        "supervisor_area_city",
+        "guard_id",
+        "guard_name",
+        "qr_id",
+        "qr_label",
+        "qr_lat",
+        "qr_lng",
+        "device_lat",
+        "device_lng",
+        "distance_meters",
+        "within_radius",
+        "reverse_geocoded_address",
+        "notes"
+    ]
+}
+
+# Default header row formatting for new tabs
+HEADER_FORMAT = {
+    'textFormat': {'bold': True},
+    'backgroundColor': {'red': 0.9, 'green': 0.9, 'blue': 0.9}
+}
+
+# Maximum number of queued updates written per batch
+MAX_BATCH_SIZE = 50
+
+# Python 3.11+ parses the trailing "Z" (UTC) suffix natively
+if sys.version_info >= (3, 11):
+    _parse_iso_datetime = datetime.fromisoformat
+else:
+    def _parse_iso_datetime(value: str) -> datetime:
+        return datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+
+
 class SheetsService:
     """Google Sheets service for real-time scan event logging"""
     
     def __init__(self):
         self.client = None
         self.spreadsheet = None
-        self.update_queue = Queue()
+        self.timezone = IST_TIMEZONE
+        
+        # Created on first use, inside the running event loop
+        self.update_queue: Optional[asyncio.Queue] = None
         self.is_running = False
-        self.update_thread = None
+        self.update_task: Optional[asyncio.Task] = None
         
-        # Headers for scan data (exact order)
-        self.headers = [
-            "Timestamp (IST)", "Guard Name", "Guard Email", "Employee Code",
-            "Supervisor Name", "Supervisor Email", "Area/City", "QR ID",
-            "Location Label", "Latitude", "Longitude", "Address",
-            "Distance from QR (m)", "Within Radius", "Scan Status", "Notes"
-        ]
+        # Updates that overflowed the queue wait on disk until the worker catches up
+        self.spill_file = Path(settings.SHEETS_SPILL_FILE)
+        self.replay_file = self.spill_file.with_suffix(".replaying")
+        # A leftover replay file means a previous run stopped mid-replay
+        self.spill_pending = self.spill_file.exists() or self.replay_file.exists()
+        self.spilled_count = 0
+        # Spill lines waiting for the writer task, so overflow never blocks the event loop on disk I/O
+        self._spill_buffer: List[str] = []
+        self._spill_task: Optional[asyncio.Task] = None
+        # Serializes spill appends with the replay claim of the spill file
+        self._spill_lock = threading.Lock()
+        
+        # Worksheet handles by tab name, filled on first lookup or creation
+        self._ws_cache: Dict[str, Any] = {}
+        # Serializes tab lookup/creation between the batch worker thread and request handlers
+        self._ws_lock = threading.Lock()
         
         # Initialize Google Sheets connection
         self._initialize_connection()
         
-        # Start background update service
-        self._start_background_updates()
-        
         logger.info(f"📊 Google Sheets service initialized with real-time updates (every {settings.UPDATE_INTERVAL_SECONDS}s)")
     
     def _initialize_connection(self) -> bool:
@@ -54,12 +146,16 @@ class SheetsService:
                 logger.warning("⚠️ Google Sheet ID not configured")
                 return False
             
-            # Authenticate with Google Sheets API
-            self.client = gspread.service_account(filename=settings.GOOGLE_SHEETS_CREDENTIALS_FILE)
+            # Authenticate with Google Sheets API on a pooled keep-alive session
+            self.client = create_sheets_client_from_file(settings.GOOGLE_SHEETS_CREDENTIALS_FILE)
             
             # Open the spreadsheet
             self.spreadsheet = self.client.open_by_key(settings.GOOGLE_SHEET_ID)
             
+            # One metadata fetch registers every existing tab up front
+            for worksheet in self.spreadsheet.worksheets():
+                self._ws_cache[worksheet.title] = worksheet
+            
             logger.info(f"✅ Connected to Google Sheet: {self.spreadsheet.title}")
             return True
             
@@ -73,79 +169,244 @@ class SheetsService:
             logger.error(f"❌ Failed to initialize Google Sheets: {e}")
             return False
     
-    def _start_background_updates(self):
-        """Start background thread for real-time updates"""
-        if self.client and self.spreadsheet:
+    def _ensure_background_updates(self):
+        """Start the background update task on the running event loop if it is not running"""
+        if not self.client or not self.spreadsheet:
+            return
+        
+        if self.update_queue is None:
+            self.update_queue = asyncio.Queue(maxsize=settings.SHEETS_QUEUE_MAX_SIZE)
+        
+        if self.update_task is None or self.update_task.done():
             self.is_running = True
-            self.update_thread = threading.Thread(target=self._background_update_worker, daemon=True)
-            self.update_thread.start()
+            self.update_task = asyncio.create_task(self._background_update_worker())
             logger.info("🔄 Started background update service for real-time Google Sheets sync")
     
-    def _background_update_worker(self):
-        """Background worker that processes update queue every second"""
+    async def _background_update_worker(self):
+        """Background task that coalesces queued updates into batches"""
         while self.is_running:
             try:
-                # Collect all pending updates
-                batch_updates = []
-                while not self.update_queue.empty() and len(batch_updates) < 50:  # Max 50 updates per batch
+                # Replay spilled updates (including any left from a previous run) once the queue is idle
+                if self.spill_pending and self.update_queue.empty():
+                    await self._replay_spilled_updates()
+                
+                # Wake on the first update, then coalesce more until the batch is full or the window closes
+                batch_updates = [await self.update_queue.get()]
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + settings.UPDATE_INTERVAL_SECONDS
+                
+                while len(batch_updates) < MAX_BATCH_SIZE:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
                     try:
-                        update_data = self.update_queue.get_nowait()
-                        batch_updates.append(update_data)
-                    except:
+                        batch_updates.append(await asyncio.wait_for(self.update_queue.get(), timeout=remaining))
+                    except asyncio.TimeoutError:
                         break
                 
-                # Process batch updates
-                if batch_updates:
-                    self._process_batch_updates(batch_updates)
+                # gspread is blocking, so write the batch from a worker thread
+                failed_updates = await asyncio.to_thread(self._process_batch_updates, batch_updates)
                 
-                # Wait for next interval
-                time.sleep(settings.UPDATE_INTERVAL_SECONDS)
+                # Keep rows that could not be written on disk for the next replay
+                for update_item in failed_updates:
+                    self._spill_update(update_item)
                 
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.error(f"❌ Error in background update worker: {e}")
-                time.sleep(5)  # Wait 5 seconds on error
+                await asyncio.sleep(5)  # Wait 5 seconds on error
+    
+    def _spill_update(self, update_item: Dict[str, Any]):
+        """Buffer an update for the spill file; the writer task appends it off the event loop"""
+        record = {key: update_item.get(key) for key in ("tab_name", "row_data", "schema", "header_format")}
+        self._spill_buffer.append(json.dumps(record, default=str) + "\n")
+        self.spilled_count += 1
+        
+        if self._spill_task is None or self._spill_task.done():
+            self._spill_task = asyncio.create_task(self._flush_spill_buffer())
+    
+    async def _flush_spill_buffer(self):
+        """Append buffered spill lines to the spill file until the buffer stays empty"""
+        while self._spill_buffer:
+            lines, self._spill_buffer = self._spill_buffer, []
+            try:
+                await asyncio.to_thread(self._write_spill_lines, lines)
+            except Exception as e:
+                # Put the lines back in front of newer ones and retry on the next spill
+                self._spill_buffer[:0] = lines
+                logger.error(f"❌ Failed to write Google Sheets spill file: {e}")
+                return
+            # Set only once the lines are on disk, so a replay cannot miss them
+            self.spill_pending = True
+    
+    def _write_spill_lines(self, lines: List[str]):
+        """Append spill lines to the spill file"""
+        with self._spill_lock:
+            with self.spill_file.open("a", encoding="utf-8") as f:
+                f.writelines(lines)
     
-    def _process_batch_updates(self, batch_updates: List[Dict[str, Any]]):
-        """Process a batch of updates to Google Sheets"""
+    def _claim_spill_file(self):
+        """
+        Move spilled updates into the replay file so new overflow starts a fresh spill file
+        
+        A replay file left by an interrupted replay is kept and the new spill is appended to it.
+        Holds the spill lock so no append lands between the copy and the unlink.
+        """
+        with self._spill_lock:
+            if not self.spill_file.exists():
+                return
+            
+            if not self.replay_file.exists():
+                self.spill_file.replace(self.replay_file)
+                return
+            
+            with self.spill_file.open("rb") as src, self.replay_file.open("ab") as dst:
+                shutil.copyfileobj(src, dst)
+            self.spill_file.unlink()
+    
+    def _rewrite_replay_file(self, updates: List[Dict[str, Any]]):
+        """Atomically replace the replay file with the updates still to be written"""
+        tmp_file = self.replay_file.with_suffix(".tmp")
+        with tmp_file.open("w", encoding="utf-8") as f:
+            for update_item in updates:
+                f.write(json.dumps(update_item, default=str) + "\n")
+        tmp_file.replace(self.replay_file)
+    
+    async def _replay_spilled_updates(self):
+        """Write spilled updates to Google Sheets in batches, keeping any that fail on disk"""
+        self.spill_pending = False
+        await asyncio.to_thread(self._claim_spill_file)
+        if not self.replay_file.exists():
+            return
+        
+        def read_spilled() -> List[Dict[str, Any]]:
+            with self.replay_file.open(encoding="utf-8") as f:
+                return [json.loads(line) for line in f if line.strip()]
+        
+        spilled_updates = await asyncio.to_thread(read_spilled)
+        logger.info(f"📂 Replaying {len(spilled_updates)} spilled Google Sheets updates")
+        
+        failed_updates = []
+        for i in range(0, len(spilled_updates), MAX_BATCH_SIZE):
+            failed_updates.extend(
+                await asyncio.to_thread(self._process_batch_updates, spilled_updates[i:i + MAX_BATCH_SIZE])
+            )
+        
+        # Only rows confirmed written are dropped; the rest are retried on a later replay
+        if failed_updates:
+            await asyncio.to_thread(self._rewrite_replay_file, failed_updates)
+            self.spill_pending = True
+            logger.warning(f"⚠️ {len(failed_updates)} spilled Google Sheets updates failed, kept for retry")
+        else:
+            self.replay_file.unlink(missing_ok=True)
+    
+    def _process_batch_updates(self, batch_updates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Process a batch of updates to Google Sheets
+        
+        Returns:
+            Updates that were not written (empty if the whole batch succeeded)
+        """
         try:
+            # Group rows per tab so each tab costs one append request per batch,
+            # skipping exact duplicates (client retries) within the batch
+            rows_by_tab = defaultdict(list)
+            updates_by_tab = defaultdict(list)
+            tab_layouts = {}
+            seen_rows = set()
             for update_data in batch_updates:
                 tab_name = update_data.get("tab_name")
                 row_data = update_data.get("row_data")
                 
                 if tab_name and row_data:
-                    worksheet = self._get_or_create_worksheet(tab_name)
-                    if worksheet:
-                        worksheet.append_row(row_data)
-                        logger.info(f"✅ Added scan to {tab_name} worksheet")
+                    row_key = hashlib.blake2b(
+                        json.dumps([tab_name, row_data], separators=(",", ":"), default=str).encode(),
+                        digest_size=8
+                    ).digest()
+                    if row_key in seen_rows:
+                        continue
+                    seen_rows.add(row_key)
+                    rows_by_tab[tab_name].append(row_data)
+                    updates_by_tab[tab_name].append(update_data)
+                    tab_layouts.setdefault(tab_name, (
+                        SheetSchema(update_data.get("schema") or SheetSchema.SCAN_EVENTS),
+                        update_data.get("header_format") or HEADER_FORMAT
+                    ))
+            
+            appended_rows = appended_tabs = 0
+            failed_updates = []
+            for tab_name, rows in rows_by_tab.items():
+                schema, header_format = tab_layouts[tab_name]
+                worksheet = self.get_or_create_worksheet(tab_name, schema, header_format)
+                if not worksheet:
+                    failed_updates.extend(updates_by_tab[tab_name])
+                    continue
+                try:
+                    call_with_retry(
+                        worksheet.append_rows,
+                        rows,
+                        value_input_option="RAW",
+                        insert_data_option="INSERT_ROWS",
+                        table_range="A1"
+                    )
+                except Exception as e:
+                    logger.error(f"❌ Failed to append {len(rows)} rows to {tab_name}: {e}")
+                    failed_updates.extend(updates_by_tab[tab_name])
+                    continue
+                appended_rows += len(rows)
+                appended_tabs += 1
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Added {len(rows)} scans to {tab_name} worksheet")
             
-            logger.info(f"📊 Processed {len(batch_updates)} updates to Google Sheets")
+            # One summary line per batch instead of one per tab/row
+            logger.info(f"📊 Appended {appended_rows} rows to {appended_tabs} tabs ({len(batch_updates)} updates)")
+            return failed_updates
             
         except Exception as e:
             logger.error(f"❌ Failed to process batch updates: {e}")
+            return list(batch_updates)
     
-    def _get_or_create_worksheet(self, tab_name: str):
-        """Get or create a worksheet with the given tab name"""
+    def get_worksheet(self, tab_name: str):
+        """
+        Get an existing worksheet, fetching tab metadata only on first use
+        
+        Raises:
+            gspread.WorksheetNotFound: If the tab does not exist
+        """
+        worksheet = self._ws_cache.get(tab_name)
+        if worksheet is None:
+            worksheet = self.spreadsheet.worksheet(tab_name)
+            self._ws_cache[tab_name] = worksheet
+        return worksheet
+    
+    def get_or_create_worksheet(
+        self,
+        tab_name: str,
+        schema: SheetSchema = SheetSchema.SCAN_EVENTS,
+        header_format: Optional[Dict[str, Any]] = None
+    ):
+        """Get or create a worksheet with the given tab name and column layout"""
         try:
             if not self.spreadsheet:
                 return None
             
-            # Check if worksheet exists
-            try:
-                worksheet = self.spreadsheet.worksheet(tab_name)
+            worksheet = self._ws_cache.get(tab_name)
+            if worksheet is not None:
                 return worksheet
-            except gspread.WorksheetNotFound:
-                pass
-            
-            # Create new worksheet
-            worksheet = self.spreadsheet.add_worksheet(title=tab_name, rows=1000, cols=16)
             
-            # Add headers
-            worksheet.insert_row(self.headers, 1)
-            worksheet.format('A1:P1', {
-                'textFormat': {'bold': True},
-                'backgroundColor': {'red': 0.9, 'green': 0.9, 'blue': 0.9}
-            })
-            worksheet.freeze(rows=1)
+            # Re-check under the lock so two threads never both send addSheet for one title
+            with self._ws_lock:
+                try:
+                    return self.get_worksheet(tab_name)
+                except gspread.WorksheetNotFound:
+                    pass
+                
+                # Create new worksheet with a formatted, frozen header row
+                worksheet = add_worksheet_with_header(
+                    self.spreadsheet, tab_name, SHEET_HEADERS[schema], header_format or HEADER_FORMAT
+                )
+                self._ws_cache[tab_name] = worksheet
             
             logger.info(f"✅ Created new worksheet: {tab_name}")
             return worksheet
@@ -166,15 +427,12 @@ class SheetsService:
             tab_name = f"{supervisor_area}_SCANS"
             
             # Convert scan data to row format
-            ist_time = scan_data.get("scannedAt", datetime.utcnow())
-            if isinstance(ist_time, str):
-                ist_time = datetime.fromisoformat(ist_time.replace('Z', '+00:00'))
-            
-            # Convert to IST
-            ist_time = ist_time.replace(tzinfo=timezone.utc).astimezone()
+            scanned_at = scan_data.get("scannedAt", datetime.utcnow())
+            if isinstance(scanned_at, str):
+                scanned_at = _parse_iso_datetime(scanned_at)
             
             row_data = [
-                ist_time.strftime("%d-%m-%Y %H:%M:%S"),
+                format_timestamp_ist(scanned_at),
                 scan_data.get("guardName", ""),
                 scan_data.get("guardEmail", ""),
                 scan_data.get("guardEmployeeCode", ""),
@@ -193,20 +451,53 @@ class SheetsService:
             ]
             
             # Add to update queue for real-time processing
-            update_item = {
-                "tab_name": tab_name,
-                "row_data": row_data,
-                "timestamp": datetime.utcnow()
-            }
-            
-            self.update_queue.put(update_item)
-            logger.info(f"📝 Queued scan data for real-time update to {tab_name}")
-            return True
+            return self.enqueue_update(tab_name, row_data)
             
         except Exception as e:
             logger.error(f"❌ Failed to queue scan for sheets update: {e}")
             return False
     
+    def enqueue_update(
+        self,
+        tab_name: str,
+        row_data: List[Any],
+        schema: SheetSchema = SheetSchema.SCAN_EVENTS,
+        header_format: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Queue one row for the background writer (call from within the event loop)
+        
+        Args:
+            tab_name: Target tab, created with the schema's headers if missing
+            row_data: Cell values in the schema's column order
+            schema: Column layout of the row
+            header_format: Header row format used if the tab has to be created
+            
+        Returns:
+            True if queued (or spilled to disk), False if Sheets is unavailable
+        """
+        if not self.client or not self.spreadsheet:
+            return False
+        
+        update_item = {
+            "tab_name": tab_name,
+            "row_data": row_data,
+            "schema": schema,
+            "header_format": header_format,
+            "timestamp": datetime.utcnow()
+        }
+        
+        self._ensure_background_updates()
+        try:
+            self.update_queue.put_nowait(update_item)
+        except asyncio.QueueFull:
+            self._spill_update(update_item)
+            logger.warning(f"⚠️ Google Sheets queue full, spilled scan for {tab_name} to {self.spill_file}")
+            return True
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Queued scan data for real-time update to {tab_name}")
+        return True
+    
     def get_sheet_health(self) -> Dict[str, Any]:
         """Get Google Sheets service health status"""
         try:
@@ -218,12 +509,13 @@ class SheetsService:
             
             # Test connection
             title = self.spreadsheet.title
-            queue_size = self.update_queue.qsize()
+            queue_size = self.update_queue.qsize() if self.update_queue else 0
             
             return {
                 "status": "connected",
                 "spreadsheet_title": title,
                 "queue_size": queue_size,
+                "spilled_updates": self.spilled_count,
                 "update_interval": settings.UPDATE_INTERVAL_SECONDS,
                 "background_worker": "running" if self.is_running else "stopped"
             }
@@ -237,9 +529,21 @@ class SheetsService:
     def stop_background_updates(self):
         """Stop the background update service"""
         self.is_running = False
-        if self.update_thread:
-            self.update_thread.join(timeout=5)
+        if self.update_task:
+            self.update_task.cancel()
+        # Write spill lines the writer task has not picked up yet before the loop goes away
+        if self._spill_buffer:
+            lines, self._spill_buffer = self._spill_buffer, []
+            try:
+                self._write_spill_lines(lines)
+            except Exception as e:
+                logger.error(f"❌ Failed to write {len(lines)} spilled Google Sheets updates on shutdown: {e}")
         logger.info("🛑 Stopped background update service")
 
-# Create global instance
-sheets_service = SheetsService()
+
+@cache
+def get_sheets_service() -> Optional[SheetsService]:
+    """Get the shared sheets service, constructing it on first use (None when ENABLE_SHEETS is off)"""
+    if not settings.ENABLE_SHEETS:
+        return None
+    return SheetsService()
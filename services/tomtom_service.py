@@ -3,14 +3,89 @@ TomTom API service for reverse geocoding and address lookup
 Focused on POI search and human-readable addresses for Indian locations
 """
 
+import asyncio
+import math
+import re
 import httpx
-from typing import Optional, Dict, Any, Tuple
+import numpy as np
+import orjson
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Set, Tuple
 from config import settings
+from database import get_geocode_cache_collection
+from services.ttl_cache import TTLCache
 import logging
-from geopy.distance import geodesic
 
 logger = logging.getLogger(__name__)
 
+# Mean Earth radius in meters (IUGG), used by the haversine distance
+EARTH_RADIUS_METERS = 6371008.8
+
+# India geographical boundaries (approximate)
+INDIA_MIN_LAT = 6.0   # Southern tip
+INDIA_MAX_LAT = 37.0  # Northern tip
+INDIA_MIN_LON = 68.0  # Western tip
+INDIA_MAX_LON = 97.0  # Eastern tip
+
+# Words that mark a POI name as too generic to show in an address
+_GENERIC_POI_RE = re.compile(r"\b(?:unnamed|road|highway|street)\b", re.IGNORECASE)
+
+# TomTom address fields appended after the POI name, most to least specific
+_ADDRESS_FIELDS = ("streetName", "municipality", "countrySecondarySubdivision", "countrySubdivision")
+
+# Per-phase limits: fail fast on a hung handshake or pool wait instead of one flat 10s
+_TOMTOM_TIMEOUT = httpx.Timeout(connect=1.5, read=3.0, write=1.0, pool=0.5)
+
+# Attempts per TomTom GET when the response read times out, and the first backoff
+TOMTOM_MAX_ATTEMPTS = 2
+TOMTOM_RETRY_DELAY_SECONDS = 0.2
+
+# Nearby POIs fetched per search, so a generic nearest hit can fall back to the next one
+POI_SEARCH_LIMIT = 3
+
+# TomTom Search API paths, relative to the shared client's base_url
+_POI_PATH = "/search/2/nearbySearch/.json"
+_REVERSE_PATH_TEMPLATE = "/search/2/reverseGeocode/{},{}.json"
+
+# Decimal places kept in reverse geocode cache keys (5 places is roughly 1 m)
+COORDINATE_CACHE_PRECISION = 5
+
+
+def format_address(poi_data: Optional[Dict[str, Any]], address_data: Dict[str, Any]) -> str:
+    """
+    Build a human-readable address from a nearby POI and a TomTom address
+    
+    Args:
+        poi_data: Nearby POI from search_poi, if any
+        address_data: Address dict from a reverseGeocode result
+        
+    Returns:
+        POI name (unless generic) plus street, locality, district and state,
+        or TomTom's freeform address when none of those are present
+    """
+    address_parts: List[str] = []
+    seen_parts: Set[str] = set()
+    
+    # Add POI name if found and relevant (generic names are filtered out)
+    if poi_data and poi_data.get("name"):
+        poi_name: str = poi_data["name"]
+        if not _GENERIC_POI_RE.search(poi_name):
+            address_parts.append(poi_name)
+            seen_parts.add(poi_name.lower())
+    
+    # Add street, locality, district and state, skipping repeats
+    for field in _ADDRESS_FIELDS:
+        value: Optional[str] = address_data.get(field)
+        if value:
+            key = value.lower()
+            if key not in seen_parts:
+                seen_parts.add(key)
+                address_parts.append(value)
+    
+    if address_parts:
+        return ", ".join(address_parts)
+    return address_data.get("freeformAddress", "Address not available")
+
 
 class TomTomService:
     """Enhanced TomTom service for reverse geocoding and POI search"""
@@ -19,16 +94,124 @@ class TomTomService:
         self.api_key = settings.TOMTOM_API_KEY
         self.base_url = "https://api.tomtom.com"
         
+        # Fixed query parameters per endpoint; calls only add coordinates and radius
+        poi_params = [("key", self.api_key), ("limit", str(POI_SEARCH_LIMIT)), ("countrySet", "IN")]
+        # Only named-place categories, so road/street hits never come back
+        if settings.TOMTOM_POI_CATEGORY_SET:
+            poi_params.append(("categorySet", settings.TOMTOM_POI_CATEGORY_SET))
+        self._poi_params = tuple(poi_params)
+        self._reverse_params = (("key", self.api_key), ("radius", "50"), ("limit", "1"), ("countrySet", "IN"))
+        
+        # One pooled keep-alive client for every TomTom call (closed on shutdown);
+        # HTTP/2 lets the concurrent POI and reverse geocode requests share a connection
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=_TOMTOM_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=100, max_connections=200),
+            http2=True
+        )
+        
         # India geographical boundaries (approximate)
         self.india_bounds = {
-            "min_lat": 6.0,   # Southern tip
-            "max_lat": 37.0,  # Northern tip
-            "min_lon": 68.0,  # Western tip
-            "max_lon": 97.0   # Eastern tip
+            "min_lat": INDIA_MIN_LAT,
+            "max_lat": INDIA_MAX_LAT,
+            "min_lon": INDIA_MIN_LON,
+            "max_lon": INDIA_MAX_LON
         }
         
+        # Reverse geocode results: rounded (lat, lon) -> (formatted_address, response_data)
+        self._address_cache = TTLCache(settings.TOMTOM_CACHE_MAX_SIZE, settings.TOMTOM_CACHE_TTL_SECONDS)
+        
+        # Lookups in progress by the same rounded key, awaited by concurrent callers
+        self._inflight: Dict[Tuple[float, float], asyncio.Task] = {}
+        
         if not self.api_key:
             logger.warning("⚠️ TOMTOM_API_KEY not found. Reverse geocoding will be limited.")
+            # Without a key every lookup is a no-op, so bind the no-op versions once
+            self.search_poi = self._search_poi_without_key
+            self.reverse_geocode_enhanced = self._reverse_geocode_without_key
+    
+    async def _search_poi_without_key(self, latitude: float, longitude: float, radius: int = 50) -> Optional[Dict[str, Any]]:
+        """search_poi when TOMTOM_API_KEY is not configured"""
+        return None
+    
+    async def _reverse_geocode_without_key(self, latitude: float, longitude: float) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """reverse_geocode_enhanced when TOMTOM_API_KEY is not configured"""
+        return None, None
+    
+    @staticmethod
+    def _coordinate_key(latitude: float, longitude: float) -> Tuple[float, float]:
+        """Cache key for coordinates, rounded so repeat checks at one checkpoint share it"""
+        return (round(latitude, COORDINATE_CACHE_PRECISION), round(longitude, COORDINATE_CACHE_PRECISION))
+    
+    @staticmethod
+    def _persisted_key(cache_key: Tuple[float, float]) -> str:
+        """Document _id for rounded coordinates in the geocode_cache collection"""
+        return f"{cache_key[0]:.{COORDINATE_CACHE_PRECISION}f},{cache_key[1]:.{COORDINATE_CACHE_PRECISION}f}"
+    
+    async def _load_persisted_address(self, cache_key: Tuple[float, float]) -> Optional[Dict[str, Any]]:
+        """Return the geocode_cache entry for the coordinates, if stored and not expired"""
+        geocode_cache_collection = get_geocode_cache_collection()
+        if geocode_cache_collection is None:
+            return None
+        
+        try:
+            entry = await geocode_cache_collection.find_one(
+                {"_id": self._persisted_key(cache_key), "expiresAt": {"$gt": datetime.utcnow()}},
+                {"formattedAddress": 1, "responseData": 1, "etag": 1, "revalidateAt": 1}
+            )
+        except Exception as e:
+            logger.warning("Geocode cache lookup failed: %s", e)
+            return None
+        
+        return entry
+    
+    async def _persist_address(
+        self,
+        cache_key: Tuple[float, float],
+        formatted_address: str,
+        response_data: Dict[str, Any],
+        etag: Optional[str] = None
+    ) -> None:
+        """Store a resolved address so it survives restarts (expired by the collection's TTL index)"""
+        geocode_cache_collection = get_geocode_cache_collection()
+        if geocode_cache_collection is None:
+            return
+        
+        now = datetime.utcnow()
+        try:
+            await geocode_cache_collection.replace_one(
+                {"_id": self._persisted_key(cache_key)},
+                {
+                    "formattedAddress": formatted_address,
+                    "responseData": response_data,
+                    "etag": etag,
+                    "cachedAt": now,
+                    "revalidateAt": now + timedelta(seconds=settings.TOMTOM_CACHE_TTL_SECONDS),
+                    "expiresAt": now + timedelta(days=settings.TOMTOM_PERSISTENT_CACHE_DAYS)
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning("Geocode cache write failed: %s", e)
+    
+    async def _touch_persisted_address(self, cache_key: Tuple[float, float]) -> None:
+        """Mark a persisted address as revalidated (TomTom answered 304 Not Modified)"""
+        geocode_cache_collection = get_geocode_cache_collection()
+        if geocode_cache_collection is None:
+            return
+        
+        now = datetime.utcnow()
+        try:
+            await geocode_cache_collection.update_one(
+                {"_id": self._persisted_key(cache_key)},
+                {"$set": {
+                    "revalidateAt": now + timedelta(seconds=settings.TOMTOM_CACHE_TTL_SECONDS),
+                    "expiresAt": now + timedelta(days=settings.TOMTOM_PERSISTENT_CACHE_DAYS)
+                }}
+            )
+        except Exception as e:
+            logger.warning("Geocode cache write failed: %s", e)
     
     def validate_india_coordinates(self, latitude: float, longitude: float) -> bool:
         """
@@ -41,8 +224,25 @@ class TomTomService:
         Returns:
             True if coordinates are within India, False otherwise
         """
-        return (self.india_bounds["min_lat"] <= latitude <= self.india_bounds["max_lat"] and
-                self.india_bounds["min_lon"] <= longitude <= self.india_bounds["max_lon"])
+        return INDIA_MIN_LAT <= latitude <= INDIA_MAX_LAT and INDIA_MIN_LON <= longitude <= INDIA_MAX_LON
+    
+    def validate_india_coordinates_batch(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """
+        Validate many coordinates against India's geographical boundaries at once
+        
+        Args:
+            latitudes: Array of latitude coordinates
+            longitudes: Array of longitude coordinates
+            
+        Returns:
+            Boolean array, True where the coordinate is within India
+        """
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        return (
+            (latitudes >= INDIA_MIN_LAT) & (latitudes <= INDIA_MAX_LAT) &
+            (longitudes >= INDIA_MIN_LON) & (longitudes <= INDIA_MAX_LON)
+        )
     
     def calculate_distance(self, lat1: float, lng1: float, lat2: float, lng2: float) -> float:
         """
@@ -56,13 +256,46 @@ class TomTomService:
             Distance in meters
         """
         try:
-            distance = geodesic((lat1, lng1), (lat2, lng2)).meters
-            return round(distance, 2)
+            # Haversine: well within a meter of geodesic at checkpoint radius scale
+            phi1 = math.radians(lat1)
+            phi2 = math.radians(lat2)
+            d_phi = phi2 - phi1
+            d_lambda = math.radians(lng2 - lng1)
+            a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+            return round(2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(a)), 2)
         except Exception as e:
-            logger.error(f"Error calculating distance: {e}")
+            logger.error("Error calculating distance: %s", e)
             return 0.0
     
-    async def search_poi(self, latitude: float, longitude: float, radius: int = 100) -> Optional[Dict[str, Any]]:
+    def calculate_distances_batch(self, lats1: np.ndarray, lngs1: np.ndarray, lats2: np.ndarray, lngs2: np.ndarray) -> np.ndarray:
+        """
+        Calculate element-wise distances between coordinate arrays in meters
+        
+        Args:
+            lats1, lngs1: First coordinates (arrays or scalars, broadcast together)
+            lats2, lngs2: Second coordinates
+            
+        Returns:
+            Array of distances in meters, rounded to 2 decimals
+        """
+        phi1 = np.radians(lats1)
+        phi2 = np.radians(lats2)
+        d_phi = phi2 - phi1
+        d_lambda = np.radians(np.subtract(lngs2, lngs1))
+        a = np.sin(d_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+        return np.round(2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(a)), 2)
+    
+    async def _get(self, url: str, params, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """GET from TomTom, retrying read timeouts with exponential backoff"""
+        for attempt in range(TOMTOM_MAX_ATTEMPTS):
+            try:
+                return await self._client.get(url, params=params, headers=headers)
+            except httpx.ReadTimeout:
+                if attempt == TOMTOM_MAX_ATTEMPTS - 1:
+                    raise
+                await asyncio.sleep(TOMTOM_RETRY_DELAY_SECONDS * 2 ** attempt)
+    
+    async def search_poi(self, latitude: float, longitude: float, radius: int = 50) -> Optional[Dict[str, Any]]:
         """
         Search for POI (Point of Interest) near coordinates
         
@@ -72,43 +305,66 @@ class TomTomService:
             radius: Search radius in meters
             
         Returns:
-            POI information if found, None otherwise
+            Nearest POI with a non-generic name if found, None otherwise
         """
-        if not self.api_key:
-            return None
-        
         try:
-            url = f"{self.base_url}/search/2/nearbySearch/.json"
-            params = {
-                "key": self.api_key,
-                "lat": latitude,
-                "lon": longitude,
-                "radius": radius,
-                "limit": 1,
-                "countrySet": "IN"
-            }
-            
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                if data.get("results") and len(data["results"]) > 0:
-                    poi = data["results"][0]
+            params = (*self._poi_params, ("lat", latitude), ("lon", longitude), ("radius", radius))
+            
+            response = await self._get(_POI_PATH, params)
+            response.raise_for_status()
+            
+            data = orjson.loads(response.content)
+            
+            # Results come nearest first; skip unnamed and generic (road/street) hits
+            for poi in data.get("results") or ():
+                name = poi.get("poi", {}).get("name")
+                if name and not _GENERIC_POI_RE.search(name):
                     return {
-                        "name": poi.get("poi", {}).get("name"),
+                        "name": name,
                         "category": poi.get("poi", {}).get("categories", []),
                         "address": poi.get("address", {}),
                         "distance": poi.get("dist", 0)
                     }
-                
-                return None
-                
+            
+            return None
+            
         except Exception as e:
-            logger.error(f"Error in POI search: {e}")
+            logger.error("Error in POI search: %s", e)
             return None
     
+    async def _fetch_reverse(
+        self,
+        latitude: float,
+        longitude: float,
+        etag: Optional[str] = None
+    ) -> Optional[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+        """
+        Reverse geocode coordinates to TomTom's best address match
+        
+        Args:
+            latitude: Latitude coordinate
+            longitude: Longitude coordinate
+            etag: ETag of a cached response, sent as If-None-Match
+            
+        Returns:
+            Tuple of (first result's address dict or None, response ETag or None),
+            or None if an etag was given and TomTom answered 304 Not Modified
+        """
+        url = _REVERSE_PATH_TEMPLATE.format(latitude, longitude)
+        headers = {"If-None-Match": etag} if etag else None
+        
+        response = await self._get(url, self._reverse_params, headers)
+        if etag and response.status_code == 304:
+            return None
+        response.raise_for_status()
+        
+        data = orjson.loads(response.content)
+        etag = response.headers.get("ETag")
+        
+        if data.get("addresses") and len(data["addresses"]) > 0:
+            return data["addresses"][0]["address"], etag
+        return None, etag
+    
     async def reverse_geocode_enhanced(self, latitude: float, longitude: float) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
         """
         Enhanced reverse geocode with POI search for human-readable addresses
@@ -120,89 +376,104 @@ class TomTomService:
         Returns:
             Tuple of (formatted_address, tomtom_response_data)
         """
-        if not self.api_key:
-            return None, None
-        
-        # Validate coordinates are within India
+        # Validate coordinates are within India (before any cache or HTTP work)
         if not self.validate_india_coordinates(latitude, longitude):
             return "Location outside India", None
         
-        try:
-            # First, try to find a POI nearby
-            poi_data = await self.search_poi(latitude, longitude, radius=50)
-            
-            # Then do reverse geocoding for address
-            url = f"{self.base_url}/search/2/reverseGeocode/{latitude},{longitude}.json"
-            params = {
-                "key": self.api_key,
-                "radius": 100,
-                "limit": 1,
-                "countrySet": "IN"
-            }
-            
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                if data.get("addresses") and len(data["addresses"]) > 0:
-                    address_data = data["addresses"][0]["address"]
-                    
-                    # Build enhanced address with POI if available
-                    address_parts = []
-                    
-                    # Add POI name if found and relevant
-                    if poi_data and poi_data.get("name"):
-                        poi_name = poi_data["name"]
-                        # Filter out generic POI names
-                        if not any(generic in poi_name.lower() for generic in ["unnamed", "road", "highway", "street"]):
-                            address_parts.append(poi_name)
-                    
-                    # Add street/area information
-                    if address_data.get("streetName"):
-                        street = address_data["streetName"]
-                        if not any(part in street for part in address_parts):  # Avoid duplication
-                            address_parts.append(street)
-                    
-                    # Add locality/area
-                    if address_data.get("municipality"):
-                        municipality = address_data["municipality"]
-                        if not any(part in municipality for part in address_parts):
-                            address_parts.append(municipality)
-                    
-                    # Add district/sub-division
-                    if address_data.get("countrySecondarySubdivision"):
-                        district = address_data["countrySecondarySubdivision"]
-                        if not any(part in district for part in address_parts):
-                            address_parts.append(district)
-                    
-                    # Add state
-                    if address_data.get("countrySubdivision"):
-                        state = address_data["countrySubdivision"]
-                        if not any(part in state for part in address_parts):
-                            address_parts.append(state)
-                    
-                    # Format final address
-                    if address_parts:
-                        formatted_address = ", ".join(address_parts)
+        cache_key = self._coordinate_key(latitude, longitude)
+        cached = self._address_cache.get(cache_key)
+        if cached is not None:
+            formatted_address, response_data = cached
+            return formatted_address, {**response_data, "coordinates": {"lat": latitude, "lng": longitude}}
+        
+        # Single-flight: concurrent misses for the same spot share one lookup task.
+        # The task is owned by no caller and each caller awaits it through a shield,
+        # so one caller being cancelled never cancels the lookup for the others.
+        inflight = self._inflight.get(cache_key)
+        if inflight is None:
+            inflight = asyncio.create_task(self._resolve_address(latitude, longitude, cache_key))
+            self._inflight[cache_key] = inflight
+            inflight.add_done_callback(lambda task: self._forget_inflight(cache_key, task))
+        
+        formatted_address, response_data = await asyncio.shield(inflight)
+        if response_data is None:
+            return formatted_address, None
+        return formatted_address, {**response_data, "coordinates": {"lat": latitude, "lng": longitude}}
+    
+    def _forget_inflight(self, cache_key: Tuple[float, float], task: asyncio.Task) -> None:
+        """Drop a finished lookup task from the single-flight map"""
+        if self._inflight.get(cache_key) is task:
+            del self._inflight[cache_key]
+    
+    async def _resolve_address(
+        self,
+        latitude: float,
+        longitude: float,
+        cache_key: Tuple[float, float]
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Resolve an in-memory cache miss from the persistent cache or TomTom"""
+        # Fall through to the persistent cache before calling TomTom; stale entries
+        # with an ETag are revalidated with a conditional request (a 304 has no body)
+        reverse_result = None
+        persisted = await self._load_persisted_address(cache_key)
+        if persisted is not None:
+            revalidate_at = persisted.get("revalidateAt")
+            fresh = revalidate_at is None or revalidate_at > datetime.utcnow()
+            if not fresh and persisted.get("etag"):
+                try:
+                    revalidated = await self._fetch_reverse(latitude, longitude, persisted["etag"])
+                except Exception as e:
+                    logger.warning("Geocode cache revalidation failed: %s", e)
+                else:
+                    if revalidated is None:
+                        fresh = True
+                        await self._touch_persisted_address(cache_key)
                     else:
-                        formatted_address = address_data.get("freeformAddress", "Address not available")
-                    
-                    # Prepare response data for audit/reference
-                    response_data = {
-                        "placeId": address_data.get("id"),
-                        "poi_data": poi_data,
-                        "raw_address": address_data,
-                        "coordinates": {"lat": latitude, "lng": longitude}
-                    }
-                    
-                    return formatted_address, response_data
+                        # Changed upstream: reuse this 200 response rather than fetching again
+                        reverse_result = revalidated
+            
+            if fresh:
+                formatted_address, response_data = persisted["formattedAddress"], persisted["responseData"]
+                self._address_cache.set(cache_key, (formatted_address, response_data))
+                return formatted_address, {**response_data, "coordinates": {"lat": latitude, "lng": longitude}}
+        
+        try:
+            if reverse_result is not None:
+                # The revalidation already returned the new address; only the POI is missing
+                poi_data = await self.search_poi(latitude, longitude, radius=50)
+            else:
+                # Nearby POI and reverse geocode are independent lookups, so run them concurrently
+                poi_data, reverse_result = await asyncio.gather(
+                    self.search_poi(latitude, longitude, radius=50),
+                    self._fetch_reverse(latitude, longitude),
+                    return_exceptions=True
+                )
+                if isinstance(poi_data, Exception):
+                    poi_data = None
+                if isinstance(reverse_result, Exception):
+                    raise reverse_result
+            address_data, etag = reverse_result
+            
+            if address_data is not None:
+                # Build enhanced address with POI if available
+                formatted_address = format_address(poi_data, address_data)
                 
-                return "Address not found", None
+                # Prepare response data for audit/reference
+                response_data = {
+                    "placeId": address_data.get("id"),
+                    "poi_data": poi_data,
+                    "raw_address": address_data,
+                    "coordinates": {"lat": latitude, "lng": longitude}
+                }
                 
+                self._address_cache.set(cache_key, (formatted_address, response_data))
+                await self._persist_address(cache_key, formatted_address, response_data, etag)
+                return formatted_address, response_data
+            
+            return "Address not found", None
+            
         except Exception as e:
-            logger.error(f"Error in enhanced reverse geocoding: {e}")
+            logger.error("Error in enhanced reverse geocoding: %s", e)
             return f"Error: {str(e)}", None
     
     async def reverse_geocode(self, latitude: float, longitude: float) -> Optional[str]:
@@ -218,6 +489,32 @@ class TomTomService:
         """
         formatted_address, _ = await self.reverse_geocode_enhanced(latitude, longitude)
         return formatted_address
+    
+    async def reverse_geocode_many(self, coordinates: List[Tuple[float, float]], concurrency: int = 20) -> List[Optional[str]]:
+        """
+        Reverse geocode many coordinates concurrently, at most `concurrency` at a time
+        
+        Repeated or nearby points share the cache and in-flight lookups, so
+        duplicates in the batch cost one TomTom request.
+        
+        Args:
+            coordinates: (latitude, longitude) pairs
+            concurrency: Maximum lookups in progress at once
+            
+        Returns:
+            Formatted address strings in the same order as the input
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def reverse_geocode_one(latitude: float, longitude: float) -> Optional[str]:
+            async with semaphore:
+                return await self.reverse_geocode(latitude, longitude)
+        
+        return await asyncio.gather(*(reverse_geocode_one(lat, lng) for lat, lng in coordinates))
+    
+    async def aclose(self):
+        """Close the pooled HTTP client"""
+        await self._client.aclose()
 
 
 # Global TomTom service instance
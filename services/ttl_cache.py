@@ -0,0 +1,57 @@
+"""
+Small in-process cache with per-entry expiry
+Shared by the auth user/token caches and the TomTom address cache
+"""
+
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Dict-backed cache whose entries expire on the monotonic clock
+    
+    When full, inserting a new key evicts the oldest inserted entry. Expired
+    entries are dropped when they are next read.
+    """
+    
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, value)
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value if present and not expired, else None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        
+        return value
+    
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Cache a value for ttl_seconds (default: the cache TTL); non-positive TTLs are not cached"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return
+        
+        if key not in self._entries and len(self._entries) >= self.max_size:
+            self._entries.pop(next(iter(self._entries)), None)
+        
+        self._entries[key] = (time.monotonic() + ttl, value)
+    
+    def pop(self, key: Hashable) -> None:
+        """Drop a key if present"""
+        self._entries.pop(key, None)
+    
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Snapshot of (key, value) pairs, including entries not yet dropped as expired"""
+        return [(key, value) for key, (_, value) in self._entries.items()]